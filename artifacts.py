@@ -0,0 +1,254 @@
+import os
+import re
+import sys
+import json
+import base64
+import argparse
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from cache import content_key
+from instrumentation import tracer
+from common import env_flag, write_atomic
+from streaming import SECTION_TITLES
+from validators import produced_outputs, validate_outputs, SEVERITY_ORDER
+
+ARTIFACTS_DIR = ".artifacts"
+CONFLUENCE_TIMEOUT = 60
+PAGES = (
+    ("index", "Обзор проекта", ()),
+    ("context", "Бизнес-контекст", ("collect_requirements_dialogue", "gather_business_text")),
+    ("brd", "BRD", ("extract_requirements",)),
+    ("requirements", "Use Cases и User Stories", ("generate_use_cases_and_user_stories",)),
+    ("diagrams", "Диаграммы процессов", ("create_process_diagrams",)),
+    ("validation", "Отчет о валидации", ("validate_requirements_quality",)),
+)
+PAGE_TITLES = {page: title for page, title, _ in PAGES}
+PAGE_DIVIDER = "\n\n---\n\n"
+FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def publish_with_llm() -> bool:
+    return env_flag("PUBLISH_WITH_LLM")
+
+
+def project_id(user_input: str) -> str:
+    return os.getenv("ARTIFACTS_PROJECT") or content_key(" ".join(user_input.split()))[:16]
+
+
+def page_title(topic: str, page: str, project: str) -> str:
+    return f"{topic} — {PAGE_TITLES[page]} ({project})"
+
+
+def demote_headings(text: str, levels: int) -> str:
+    lines = []
+    in_fence = False
+    for line in text.strip().splitlines():
+        if FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and line.startswith("#"):
+            hashes = len(line) - len(line.lstrip("#"))
+            line = "#" * min(6, hashes + levels) + line[hashes:]
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def index_page(topic: str, artifacts: Dict[str, str]) -> str:
+    issues, stats = validate_outputs(produced_outputs(artifacts))
+    counts = {severity: sum(item["severity"] == severity for item in issues) for severity in SEVERITY_ORDER}
+    lines = [f"# {topic}", "", "## Страницы", ""]
+    lines += [f"- {topic} — {title}" for page, title in PAGE_TITLES.items() if page != "index"]
+    lines += ["", "## Сводка", "",
+              f"- Идентификаторов требований: {stats.get('defined_ids', 0)} "
+              f"(в матрице трассируемости: {stats.get('matrix_ids', 0)})",
+              f"- User Stories: {stats.get('user_stories', 0)}, диаграмм: {stats.get('diagrams', 0)}",
+              "- Замечания автоматической проверки: "
+              + ", ".join(f"{severity} {count}" for severity, count in counts.items())]
+    return "\n".join(lines)
+
+
+def render_pages(topic: str, artifacts: Dict[str, str]) -> Dict[str, str]:
+    pages = {}
+    for page, title, sources in PAGES:
+        if page == "index":
+            pages[page] = index_page(topic, artifacts)
+            continue
+        parts = [f"# {topic} — {title}"]
+        for source in sources:
+            if source not in artifacts:
+                continue
+            if len(sources) > 1:
+                parts.append(f"## {SECTION_TITLES.get(source, source)}\n\n{demote_headings(artifacts[source], 2)}")
+            else:
+                parts.append(demote_headings(artifacts[source], 1))
+        pages[page] = "\n\n".join(parts)
+    return pages
+
+
+def render_report(pages: Dict[str, str]) -> str:
+    return PAGE_DIVIDER.join(pages[page] for page, _, _ in PAGES if page in pages) + "\n"
+
+
+class ArtifactStore:
+    def __init__(self, directory: str = ARTIFACTS_DIR):
+        self.directory = directory
+
+    def _project_dir(self, project: str) -> str:
+        return os.path.join(self.directory, project)
+
+    def manifest(self, project: str) -> dict:
+        try:
+            with open(os.path.join(self._project_dir(project), "manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"pages": {}}
+
+    def save_manifest(self, project: str, manifest: dict) -> None:
+        write_atomic(os.path.join(self._project_dir(project), "manifest.json"),
+                     json.dumps(manifest, ensure_ascii=False, indent=2))
+
+    def page(self, project: str, page: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self._project_dir(project), f"{page}.md"), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def save(self, project: str, topic: str, pages: Dict[str, str]) -> List[str]:
+        manifest = self.manifest(project)
+        manifest["topic"] = topic
+        changed = []
+        for page, body in pages.items():
+            digest = content_key(body)
+            entry = manifest["pages"].setdefault(page, {})
+            entry["title"] = page_title(topic, page, project)
+            if entry.get("hash") != digest:
+                write_atomic(os.path.join(self._project_dir(project), f"{page}.md"), body)
+                entry["hash"] = digest
+                entry["revision"] = entry.get("revision", 0) + 1
+                changed.append(page)
+        self.save_manifest(project, manifest)
+        return changed
+
+    def pending_export(self, project: str) -> List[str]:
+        pages = self.manifest(project)["pages"]
+        return [page for page, _, _ in PAGES if page in pages
+                and (pages[page].get("exported_hash"), pages[page].get("exported_title"))
+                != (pages[page].get("hash"), pages[page].get("title"))]
+
+
+def storage_body(markdown: str) -> str:
+    return ('<ac:structured-macro ac:name="markdown"><ac:plain-text-body><![CDATA['
+            + markdown.replace("]]>", "]]]]><![CDATA[>")
+            + "]]></ac:plain-text-body></ac:structured-macro>")
+
+
+class ConfluenceClient:
+    def __init__(self, base_url: str, space: str, user: str = None, token: str = None):
+        self.base_url = base_url.rstrip("/")
+        self.space = space
+        self.headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if user and token:
+            credentials = base64.b64encode(f"{user}:{token}".encode("utf-8")).decode("ascii")
+            self.headers["Authorization"] = f"Basic {credentials}"
+        elif token:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    def _request(self, method: str, path: str, payload: dict = None) -> dict:
+        request = urllib.request.Request(
+            self.base_url + path, method=method, headers=self.headers,
+            data=json.dumps(payload).encode("utf-8") if payload is not None else None,
+        )
+        with urllib.request.urlopen(request, timeout=CONFLUENCE_TIMEOUT) as response:
+            return json.loads(response.read().decode("utf-8") or "{}")
+
+    def find(self, title: str) -> Optional[dict]:
+        query = urllib.parse.urlencode({"spaceKey": self.space, "title": title, "expand": "version"})
+        results = self._request("GET", f"/rest/api/content?{query}").get("results", [])
+        return results[0] if results else None
+
+    def upsert(self, title: str, body: str, page_id: str = None, parent_id: str = None) -> Tuple[str, int]:
+        current = None
+        if page_id:
+            try:
+                current = self._request("GET", f"/rest/api/content/{page_id}?expand=version")
+            except urllib.error.HTTPError as e:
+                if e.code != 404:
+                    raise
+        current = current or self.find(title)
+        payload = {"type": "page", "title": title, "space": {"key": self.space},
+                   "body": {"storage": {"value": storage_body(body), "representation": "storage"}}}
+        if parent_id:
+            payload["ancestors"] = [{"id": parent_id}]
+        if current is None:
+            created = self._request("POST", "/rest/api/content", payload)
+            return str(created["id"]), created.get("version", {}).get("number", 1)
+        payload["version"] = {"number": current["version"]["number"] + 1}
+        updated = self._request("PUT", f"/rest/api/content/{current['id']}", payload)
+        return str(updated["id"]), updated["version"]["number"]
+
+
+def confluence_from_env() -> Optional[ConfluenceClient]:
+    url = os.getenv("CONFLUENCE_URL")
+    if not url:
+        return None
+    return ConfluenceClient(url, os.getenv("CONFLUENCE_SPACE", "BA"), os.getenv("CONFLUENCE_USER"),
+                            os.getenv("CONFLUENCE_TOKEN"))
+
+
+def export_pages(store: ArtifactStore, project: str, client: ConfluenceClient) -> List[str]:
+    manifest = store.manifest(project)
+    pages = manifest["pages"]
+    exported = []
+    for page in store.pending_export(project):
+        entry = pages[page]
+        parent_id = pages.get("index", {}).get("page_id") if page != "index" else None
+        with tracer.span("export", page):
+            entry["page_id"], entry["version"] = client.upsert(entry["title"], store.page(project, page),
+                                                               entry.get("page_id"), parent_id)
+        entry["exported_hash"], entry["exported_title"] = entry["hash"], entry["title"]
+        exported.append(page)
+        store.save_manifest(project, manifest)
+    return exported
+
+
+def publish_artifacts(topic: str, user_input: str, artifacts: Dict[str, str],
+                      store: ArtifactStore = None, client: ConfluenceClient = None) -> str:
+    store = store or ArtifactStore(os.getenv("ARTIFACTS_DIR", ARTIFACTS_DIR))
+    client = client or confluence_from_env()
+    project = project_id(user_input)
+    with tracer.span("render", "publish_to_confluence"):
+        pages = render_pages(topic, artifacts)
+        changed = store.save(project, topic, pages)
+    print(f"Страницы документации: изменено {len(changed)} из {len(pages)} "
+          f"({', '.join(changed) or 'нет изменений'}), каталог {os.path.join(store.directory, project)}")
+    if client:
+        try:
+            exported = export_pages(store, project, client)
+            print(f"Confluence: обновлено страниц {len(exported)}")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Confluence: экспорт не выполнен, изменения будут отправлены при следующем запуске ({e})")
+    return render_report(pages)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored documentation pages to Confluence")
+    parser.add_argument("project", nargs="?", help="project id (a directory under the artifacts dir)")
+    parser.add_argument("--dir", default=os.getenv("ARTIFACTS_DIR", ARTIFACTS_DIR))
+    args = parser.parse_args(argv)
+    store = ArtifactStore(args.dir)
+    projects = [args.project] if args.project else sorted(os.listdir(args.dir)) if os.path.isdir(args.dir) else []
+    client = confluence_from_env()
+    for project in projects:
+        pending = store.pending_export(project)
+        if client and pending:
+            pending = export_pages(store, project, client)
+        print(f"{project}: {store.manifest(project).get('topic', '')} — "
+              f"{'exported' if client else 'pending'} {', '.join(pending) or 'nothing'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
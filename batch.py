@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator
+
+from dotenv import load_dotenv
+
+from streaming import is_draft
+
+DEFAULT_WORKERS = 4
+DEFAULT_OUTPUT_DIR = "reports"
+
+
+def read_problems(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            problem = (record.get("problem") or record.get("user_input") or "").strip()
+            if not problem:
+                print(f"Строка {line_number}: пустое описание задачи, пропущено")
+                continue
+            yield {"id": str(record.get("id", line_number)), "problem": problem}
+
+
+def output_path(output_dir: str, job_id: str) -> str:
+    safe_id = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in job_id)
+    return os.path.join(output_dir, f"{safe_id}.md")
+
+
+def share_rate_limits(workers: int) -> None:
+    from rate_limit import share_limits
+
+    share_limits(workers)
+
+
+def run_problem(job: dict, output_dir: str, task_workers: int) -> dict:
+    load_dotenv()
+    from tasks import make_topic, run_pipeline
+
+    path = output_path(output_dir, job["id"])
+    started = time.perf_counter()
+    try:
+        run_pipeline(make_topic(job["problem"]), job["problem"], max_workers=task_workers,
+                     output_file=path)
+        status, error = "ok", None
+    except Exception as e:
+        status, error = "failed", str(e)
+    return {"id": job["id"], "status": status, "error": error, "output": path,
+            "seconds": round(time.perf_counter() - started, 2)}
+
+
+def run_batch(input_path: str, output_dir: str = DEFAULT_OUTPUT_DIR, workers: int = DEFAULT_WORKERS,
+              task_workers: int = 1, skip_existing: bool = False) -> dict:
+    os.makedirs(output_dir, exist_ok=True)
+    summary = {"ok": 0, "failed": 0, "skipped": 0}
+    started = time.perf_counter()
+    jobs = read_problems(input_path)
+    with open(os.path.join(output_dir, "results.jsonl"), "a", encoding="utf-8") as results, \
+            ProcessPoolExecutor(max_workers=workers, initializer=share_rate_limits, initargs=(workers,)) as pool:
+        running = set()
+        exhausted = False
+        while running or not exhausted:
+            while not exhausted and len(running) < workers * 2:
+                job = next(jobs, None)
+                if job is None:
+                    exhausted = True
+                    break
+                path = output_path(output_dir, job["id"])
+                if skip_existing and os.path.exists(path) and not is_draft(path):
+                    summary["skipped"] += 1
+                    continue
+                running.add(pool.submit(run_problem, job, output_dir, task_workers))
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                summary[result["status"]] += 1
+                results.write(json.dumps(result, ensure_ascii=False) + "\n")
+                results.flush()
+                print(f"[{result['status']}] {result['id']} за {result['seconds']}с -> {result['output']}")
+    elapsed = time.perf_counter() - started
+    processed = summary["ok"] + summary["failed"]
+    summary["seconds"] = round(elapsed, 2)
+    summary["per_minute"] = round(processed / elapsed * 60, 2) if elapsed else 0.0
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная генерация документации по JSONL-файлу задач")
+    parser.add_argument("input", help='JSONL-файл со строками вида {"id": "...", "problem": "..."}')
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="число одновременно выполняемых задач (процессов)")
+    parser.add_argument("--task-workers", type=int, default=1,
+                        help="параллельных шагов внутри одного запуска")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="пропускать задачи, для которых отчёт уже есть")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.input, args.output_dir, args.workers, args.task_workers, args.skip_existing)
+    print("=" * 80)
+    print(f" Готово: {summary['ok']}, ошибок: {summary['failed']}, пропущено: {summary['skipped']}")
+    print(f" Время: {summary['seconds']}с, пропускная способность: {summary['per_minute']} задач/мин")
+    print(f" Одновременно не более {args.workers * args.task_workers} LLM-задач")
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import mock_servers
+from search import SearchClient, http_backend
+
+BASELINE_FILE = "bench_baseline.json"
+DEFAULT_TOLERANCE = 0.2
+HIGHER_IS_BETTER = ("runs_per_minute", "cached_tokens", "prefix_tokens")
+BASE_PROBLEM = "Улучшение процесса KYC для розничных клиентов банка"
+PROCESSES = ["KYC", "кредитного скоринга", "онбординга", "AML-мониторинга", "обработки жалоб"]
+INPUT_SIZES = {"short": 0, "medium": 150, "long": 1500}
+
+SEARCH_TOPICS = [
+    "KYC regulations for retail banks",
+    "AML transaction monitoring requirements",
+    "credit scoring automation",
+    "customer onboarding digital identity",
+    "Basel III operational risk",
+    "GDPR data retention banking",
+]
+
+
+def search_workload(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        query = rng.choice(SEARCH_TOPICS)
+        if rng.random() < 0.5:
+            query = query.upper() if rng.random() < 0.5 else f"  {query}?  "
+        queries.append(query)
+    return queries
+
+
+def _timed_run(search, queries: list, concurrency: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(search, queries))
+    return time.perf_counter() - started
+
+
+def bench_search(args) -> dict:
+    mock_servers.SearchHandler.latency = args.latency
+    server = mock_servers.start_server(mock_servers.SearchHandler)
+    url = mock_servers.server_url(server)
+    queries = search_workload(args.queries)
+    try:
+        mock_servers.SearchHandler.requests = 0
+        uncached = _timed_run(lambda q: http_backend(url)(q), queries, args.concurrency)
+        uncached_requests = mock_servers.SearchHandler.requests
+
+        mock_servers.SearchHandler.requests = 0
+        client = SearchClient(http_backend(url))
+        cached = _timed_run(client.search, queries, args.concurrency)
+        cached_requests = mock_servers.SearchHandler.requests
+    finally:
+        server.shutdown()
+
+    print(f"Search benchmark: {len(queries)} queries, concurrency {args.concurrency}, "
+          f"backend latency {args.latency * 1000:.0f} ms")
+    print(f"  uncached : {uncached:7.2f}s  backend requests {uncached_requests}")
+    print(f"  pooled   : {cached:7.2f}s  backend requests {cached_requests}  {client.stats()}")
+    return {"uncached": uncached, "cached": cached}
+
+
+def problem_of_size(words: int, seed: int = 7, variant: int = 0) -> str:
+    rng = random.Random(seed + variant)
+    base = BASE_PROBLEM.replace("KYC", PROCESSES[variant % len(PROCESSES)])
+    vocabulary = base.split() + ["документы", "проверка", "клиент", "риск", "срок", "AML",
+                                 "регулятор", "скоринг", "анкета", "филиал"]
+    return " ".join([base] + [rng.choice(vocabulary) for _ in range(words)])
+
+
+def task_breakdown(spans: list) -> dict:
+    tasks = {}
+    children = {}
+    for span in spans:
+        if span["kind"] == "task":
+            tasks[span["id"]] = span
+        elif span["parent"] is not None:
+            children.setdefault(span["parent"], []).append(span)
+    breakdown = {}
+    for span_id, span in tasks.items():
+        inner = children.get(span_id, [])
+        llm_seconds = sum(child["duration"] for child in inner if child["kind"] == "llm")
+        tool_seconds = sum(child["duration"] for child in inner if child["kind"] == "tool")
+        entry = breakdown.setdefault(span["name"], {"runs": 0, "seconds": 0.0, "overhead_seconds": 0.0,
+                                                    "llm_calls": 0, "prompt_tokens_max": 0})
+        entry["runs"] += 1
+        entry["seconds"] += span["duration"]
+        entry["overhead_seconds"] += span["duration"] - llm_seconds - tool_seconds
+        entry["llm_calls"] += sum(1 for child in inner if child["kind"] == "llm")
+        entry["prompt_tokens_max"] = max([entry["prompt_tokens_max"]] +
+                                         [child["prompt_tokens"] for child in inner if child["kind"] == "llm"])
+    for entry in breakdown.values():
+        entry["seconds"] /= entry["runs"]
+        entry["overhead_seconds"] /= entry["runs"]
+    return breakdown
+
+
+def bench_crew(args) -> dict:
+    mock_servers.LLMHandler.latency = args.latency
+    mock_servers.LLMHandler.tokens_per_second = args.tokens_per_second
+    mock_servers.LLMHandler.completion_tokens = args.completion_tokens
+    mock_servers.LLMHandler.prefill_tokens_per_second = args.prefill_tokens_per_second
+    mock_servers.SearchHandler.latency = args.latency
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            mock_servers.LLMHandler.responses = json.load(f)
+    llm_server = mock_servers.start_server(mock_servers.LLMHandler)
+    search_server = mock_servers.start_server(mock_servers.SearchHandler)
+    mock_servers.offline_environment(mock_servers.server_url(llm_server, "/v1"),
+                                     mock_servers.server_url(search_server))
+    os.environ["LLM_STREAM"] = "1" if args.stream else "0"
+    results = {"config": {"latency": args.latency, "tokens_per_second": args.tokens_per_second,
+                          "stream": args.stream, "task_workers": args.task_workers,
+                          "prefill_tokens_per_second": args.prefill_tokens_per_second,
+                          "completion_tokens": args.completion_tokens, "responses": args.responses}}
+    try:
+        started = time.perf_counter()
+        from tasks import create_tasks, make_topic, run_pipeline
+        from instrumentation import tracer
+        results["import_seconds"] = time.perf_counter() - started
+
+        problem = problem_of_size(INPUT_SIZES["short"])
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            create_tasks(make_topic(problem), problem)
+        results["construction_seconds"] = (time.perf_counter() - started) / args.repeat
+
+        output_dir = tempfile.mkdtemp(prefix="bench_")
+        os.environ["ARTIFACTS_DIR"] = os.path.join(output_dir, "artifacts")
+        results["runs"] = {}
+        for size_name in args.sizes:
+            for concurrency in args.concurrency:
+                tracer.reset()
+                mock_servers.LLMHandler.reset_stats()
+
+                def run(index: int):
+                    problem = problem_of_size(INPUT_SIZES[size_name], variant=index)
+                    path = os.path.join(output_dir, f"{size_name}_{concurrency}_{index}.md")
+                    run_pipeline(make_topic(problem), problem, max_workers=args.task_workers,
+                                 store=None, pipeline_cache=None, output_file=path)
+
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    list(pool.map(run, range(concurrency)))
+                wall = time.perf_counter() - started
+                stats = dict(mock_servers.LLMHandler.stats)
+                results["runs"][f"{size_name}/c{concurrency}"] = {
+                    "wall_seconds": wall,
+                    "runs_per_minute": concurrency / wall * 60,
+                    "llm_requests": stats["requests"],
+                    "prompt_tokens": stats["prompt_tokens"],
+                    "cached_tokens": stats["cached_tokens"],
+                    "prefix_tokens": sum(span["cached_prefix_tokens"] for span in tracer.spans),
+                    "completion_tokens": stats["completion_tokens"],
+                    "llm_server_seconds": stats["server_seconds"],
+                    "tasks": task_breakdown(tracer.spans),
+                }
+    finally:
+        llm_server.shutdown()
+        search_server.shutdown()
+
+    print_crew_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            results["regressions"] = regressions
+    return results
+
+
+def print_crew_results(results: dict) -> None:
+    print(f"Import: {results['import_seconds']:.2f}s, crew construction: "
+          f"{results['construction_seconds'] * 1000:.1f} ms")
+    for run_name, run in results["runs"].items():
+        print(f"{run_name:<14} wall {run['wall_seconds']:7.2f}s  {run['runs_per_minute']:6.2f} runs/min  "
+              f"llm requests {run['llm_requests']:4d}  prompt tokens {run['prompt_tokens']}  "
+              f"cached {run['cached_tokens']} (measured prefix {run['prefix_tokens']})")
+        for task, entry in run["tasks"].items():
+            print(f"    {task:<40} {entry['seconds']:7.2f}s  overhead {entry['overhead_seconds'] * 1000:8.1f} ms  "
+                  f"max prompt {entry['prompt_tokens_max']:6d} tokens")
+
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if key in ("config", "regressions"):
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and key != "runs":
+            flat[name] = value
+    return flat
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    current = _flatten(results)
+    regressions = []
+    for name, base_value in _flatten(baseline).items():
+        value = current.get(name)
+        if value is None or base_value <= 0:
+            continue
+        if name.rsplit(".", 1)[-1] in HIGHER_IS_BETTER:
+            regressed = value < base_value * (1 - tolerance)
+        else:
+            regressed = value > base_value * (1 + tolerance)
+        if regressed:
+            regressions.append(f"{name}: {base_value:.4g} -> {value:.4g} ({value / base_value - 1:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="web search client against the local stand-in")
+    search.add_argument("--queries", type=int, default=200)
+    search.add_argument("--concurrency", type=int, default=8)
+    search.add_argument("--latency", type=float, default=0.2)
+    search.set_defaults(func=bench_search)
+
+    crew = commands.add_parser("crew", help="crew construction and end-to-end runs against a mock LLM")
+    crew.add_argument("--latency", type=float, default=0.05, help="mock time to first token, seconds")
+    crew.add_argument("--tokens-per-second", type=float, default=2000.0)
+    crew.add_argument("--prefill-tokens-per-second", type=float, default=5000.0,
+                       help="mock prompt processing speed for tokens outside the prefix cache")
+    crew.add_argument("--completion-tokens", type=int, default=800)
+    crew.add_argument("--responses", help="JSON list of recorded responses for the mock LLM to replay")
+    crew.add_argument("--sizes", nargs="+", choices=sorted(INPUT_SIZES), default=["short", "long"])
+    crew.add_argument("--concurrency", nargs="+", type=int, default=[1, 4])
+    crew.add_argument("--task-workers", type=int, default=1)
+    crew.add_argument("--stream", action="store_true",
+                      help="stream completions, which lets downstream tasks start on upstream sections")
+    crew.add_argument("--repeat", type=int, default=5, help="crew constructions to average")
+    crew.add_argument("--baseline", default=BASELINE_FILE)
+    crew.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    crew.add_argument("--save-baseline", action="store_true")
+    crew.add_argument("--output", help="write results as JSON")
+    crew.set_defaults(func=bench_crew)
+
+    args = parser.parse_args(argv)
+    results = args.func(args)
+    return 1 if results.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
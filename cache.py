@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from crewai import LLM
+
+from chunking import count_tokens
+from common import env_flag, write_atomic
+from instrumentation import tracer
+from streaming import emit_cached_response
+from rate_limit import llm_limiter
+from prompts import prefix_tracker
+
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+COMPLETION_ESTIMATE = 1000
+TRUNCATION_MARGIN = 0.95
+
+
+def content_key(*parts) -> str:
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age: float = DEFAULT_MAX_AGE, read_only: bool = False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            value = entry["value"]
+            if self.max_age and time.time() - entry.get("created", os.path.getmtime(path)) > self.max_age:
+                raise FileNotFoundError(path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        if not self.read_only:
+            # atime tracks the last use for LRU eviction; mtime stays the creation time for max_age
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value) -> None:
+        if self.read_only:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        write_atomic(path, json.dumps({"key": key, "created": time.time(), "value": value}, ensure_ascii=False))
+        with self._lock:
+            self.writes += 1
+            if self._size is None:
+                self._size = sum(entry[-1] for entry in self._entries())
+            else:
+                self._size += os.path.getsize(path) - replaced
+            over_budget = self.max_bytes and self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                if not file.endswith(".json"):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_atime, stat.st_size))
+        return entries
+
+    def evict(self) -> int:
+        if self.read_only:
+            return 0
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(entry[-1] for entry in entries)
+            now = time.time()
+            removed = 0
+            for path, created, _, size in entries:
+                expired = self.max_age and now - created > self.max_age
+                if not expired and (not self.max_bytes or total <= self.max_bytes):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            self._size = total
+            self.evictions += removed
+            return removed
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def cache_from_env(prefix: str = "LLM_CACHE", directory: str = DEFAULT_CACHE_DIR) -> DiskCache:
+    return DiskCache(
+        os.getenv(f"{prefix}_DIR", directory),
+        max_bytes=int(float(os.getenv(f"{prefix}_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024)) * 1024 * 1024),
+        max_age=float(os.getenv(f"{prefix}_MAX_AGE_DAYS", DEFAULT_MAX_AGE / 86400)) * 86400,
+        read_only=env_flag(f"{prefix}_READONLY"),
+    )
+
+
+llm_cache = cache_from_env()
+
+
+class CachedLLM(LLM):
+    def __init__(self, *args, cache: DiskCache = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache or llm_cache
+        self.cache_enabled = not env_flag("LLM_CACHE_DISABLED")
+
+    def cache_key(self, messages, tools=None) -> str:
+        return content_key(
+            self.model,
+            messages,
+            tools,
+            getattr(self, "temperature", None),
+            getattr(self, "max_tokens", None),
+            getattr(self, "stop", None),
+        )
+
+    def call(self, messages, tools=None, *args, **kwargs):
+        with tracer.span("llm", self.model, owner=self, prompt_tokens=count_tokens(_message_text(messages))) as span:
+            key = self.cache_key(messages, tools) if self.cache_enabled else None
+            response = self.cache.get(key) if key else None
+            span["cache_hit"] = response is not None
+            if response is not None and self.stream:
+                emit_cached_response(self, response)
+            reserved = span["prompt_tokens"] + (getattr(self, "max_tokens", None) or COMPLETION_ESTIMATE)
+            if response is None:
+                span["cached_prefix_tokens"] = prefix_tracker.observe(self.model, _message_text(messages))
+                response = llm_limiter.call(lambda: super(CachedLLM, self).call(messages, tools, *args, **kwargs),
+                                            tokens=reserved)
+                if key and isinstance(response, str) and response:
+                    self.cache.set(key, response)
+            span["completion_tokens"] = count_tokens(response if isinstance(response, str) else str(response))
+            max_tokens = getattr(self, "max_tokens", None)
+            if max_tokens and span["completion_tokens"] >= max_tokens * TRUNCATION_MARGIN:
+                span["truncated"] = True
+                task = tracer.current("task")
+                if task is not None:
+                    task["truncated"] = True
+            if not span["cache_hit"]:
+                llm_limiter.settle(reserved, span["prompt_tokens"] + span["completion_tokens"])
+            return response
+
+
+def _message_text(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content", "")) for message in messages)
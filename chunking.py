@@ -0,0 +1,141 @@
+import re
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List
+
+MAX_CHUNK_TOKENS = 4000
+DEFAULT_OVERLAP_TOKENS = 200
+DEFAULT_MAP_WORKERS = 4
+TOKENIZER_MODEL = "gpt-4o-mini"
+
+MAP_PROMPT = "Analyze this part of the data:\n{chunk}"
+REDUCE_PROMPT = """Merge the following partial analyses of one document into a single coherent analysis.
+Remove duplicates, keep every distinct fact, requirement and figure.
+
+{chunk}"""
+PARTIAL_DIVIDER = "\n\n----------\n\n"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # The encoding is downloaded on first use; offline hosts fall back to the estimate.
+        return None
+
+
+@lru_cache(maxsize=65536)
+def _piece_tokens(piece: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, (len(piece) + 3) // 4)
+    return len(encoding.encode(piece, disallowed_special=()))
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, (len(text) + 3) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    encoding = _encoding()
+    if encoding is None:
+        return text[:limit * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:limit])
+
+
+def iter_chunks(text: str, chunk_size: int = MAX_CHUNK_TOKENS,
+                overlap: int = DEFAULT_OVERLAP_TOKENS) -> Iterator[str]:
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    window = deque()
+    window_tokens = 0
+    fresh = False
+    for match in re.finditer(r"\S+\s*", text):
+        piece = match.group()
+        tokens = _piece_tokens(piece)
+        if fresh and window_tokens + tokens > chunk_size:
+            yield "".join(p for p, _ in window).strip()
+            while window and window_tokens > overlap:
+                window_tokens -= window.popleft()[1]
+            fresh = False
+        window.append((piece, tokens))
+        window_tokens += tokens
+        fresh = True
+    if fresh:
+        yield "".join(p for p, _ in window).strip()
+
+
+def chunk_text(text: str, chunk_size: int = MAX_CHUNK_TOKENS,
+               overlap: int = DEFAULT_OVERLAP_TOKENS) -> List[str]:
+    return list(iter_chunks(text, chunk_size, overlap))
+
+
+def bounded_map(func: Callable, items: Iterable,
+                max_workers: int = DEFAULT_MAP_WORKERS) -> List[str]:
+    results = {}
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        index = 0
+        exhausted = False
+        while running or not exhausted:
+            while not exhausted and len(running) < max_workers:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                running[pool.submit(func, item)] = index
+                index += 1
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return [results[i] for i in range(len(results))]
+
+
+def _group_partials(partials: List[str], budget: int) -> List[List[str]]:
+    groups = [[]]
+    group_tokens = 0
+    for partial in partials:
+        tokens = count_tokens(partial)
+        if len(groups[-1]) >= 2 and group_tokens + tokens > budget:
+            groups.append([])
+            group_tokens = 0
+        groups[-1].append(partial)
+        group_tokens += tokens
+    return groups
+
+
+def map_reduce(ask: Callable[[str], str], text: str, chunk_size: int = MAX_CHUNK_TOKENS,
+               overlap: int = DEFAULT_OVERLAP_TOKENS, max_workers: int = DEFAULT_MAP_WORKERS,
+               map_prompt: str = MAP_PROMPT, reduce_prompt: str = REDUCE_PROMPT) -> str:
+    counter = itertools.count(1)
+
+    def map_chunk(chunk: str) -> str:
+        print(f"Processing chunk {next(counter)}...")
+        return str(ask(map_prompt.format(chunk=chunk)))
+
+    def reduce_group(group: List[str]) -> str:
+        return str(ask(reduce_prompt.format(chunk=PARTIAL_DIVIDER.join(group))))
+
+    partials = bounded_map(map_chunk, iter_chunks(text, chunk_size, overlap), max_workers)
+    while len(partials) > 1:
+        print(f"Merging {len(partials)} partial results...")
+        partials = bounded_map(reduce_group, _group_partials(partials, chunk_size), max_workers)
+    return partials[0] if partials else ""
@@ -0,0 +1,72 @@
+import re
+import math
+from collections import Counter
+from typing import List
+
+from chunking import count_tokens, iter_chunks
+
+MAX_RESULT_TOKENS = 2000
+MAX_PASSAGE_TOKENS = 200
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.casefold())
+
+
+def split_passages(text: str, max_tokens: int = MAX_PASSAGE_TOKENS) -> List[str]:
+    passages = []
+    for block in re.split(r"\n\s*\n|\\n\\n", text):
+        block = block.strip()
+        if not block:
+            continue
+        if count_tokens(block) <= max_tokens:
+            passages.append(block)
+        else:
+            passages.extend(iter_chunks(block, max_tokens, overlap=0))
+    return passages
+
+
+def bm25_scores(query: str, passages: List[str], k1: float = BM25_K1, b: float = BM25_B) -> List[float]:
+    terms = set(tokenize(query))
+    docs = [Counter(tokenize(passage)) for passage in passages]
+    if not docs or not terms:
+        return [0.0] * len(passages)
+    avg_len = sum(sum(doc.values()) for doc in docs) / len(docs) or 1.0
+    doc_freq = {term: sum(1 for doc in docs if term in doc) for term in terms}
+    scores = []
+    for doc in docs:
+        length = sum(doc.values())
+        score = 0.0
+        for term in terms:
+            freq = doc.get(term, 0)
+            if not freq:
+                continue
+            idf = math.log(1 + (len(docs) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * freq * (k1 + 1) / (freq + k1 * (1 - b + b * length / avg_len))
+        scores.append(score)
+    return scores
+
+
+def compact(text: str, query: str, budget: int = MAX_RESULT_TOKENS) -> str:
+    if count_tokens(text) <= budget:
+        return text
+    passages = split_passages(text)
+    scores = bm25_scores(query, passages)
+    ranked = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+    if scores and scores[ranked[0]] > 0:
+        ranked = [i for i in ranked if scores[i] > 0]
+    selected = []
+    used = 0
+    for i in ranked:
+        tokens = count_tokens(passages[i])
+        if used + tokens > budget:
+            continue
+        selected.append(i)
+        used += tokens
+    omitted = len(passages) - len(selected)
+    result = "\n\n".join(passages[i] for i in sorted(selected))
+    if omitted:
+        result += f"\n\n[Пропущено {omitted} менее релевантных фрагментов для экономии токенов...]"
+    return result
@@ -0,0 +1,115 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+from chunking import count_tokens
+from compaction import bm25_scores, tokenize
+
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+TASK_CONTEXT_BUDGETS = {
+    "validate_requirements_quality": 12000,
+    "publish_to_confluence": 24000,
+}
+DUPLICATE_THRESHOLD = 0.9
+
+
+def context_budget(name: str) -> Optional[int]:
+    env_value = os.getenv(f"CONTEXT_BUDGET_{name.upper()}")
+    if env_value:
+        return int(env_value)
+    return TASK_CONTEXT_BUDGETS.get(name)
+
+
+def split_sections(text: str) -> List[str]:
+    sections = re.split(r"\n(?=#{1,6} |\*\*[^*\n]+\*\*\s*\n)", text)
+    return [section.strip() for section in sections if section.strip()]
+
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def deduplicate(sections: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    kept = []
+    seen = []
+    for source, section in sections:
+        words = set(tokenize(section))
+        if any(_similarity(words, other) >= DUPLICATE_THRESHOLD for other in seen):
+            continue
+        seen.append(words)
+        kept.append((source, section))
+    return kept
+
+
+def summarize_section(section: str) -> str:
+    lines = [line for line in section.splitlines() if line.strip()]
+    if not lines:
+        return ""
+    heading, body = lines[0], " ".join(line.strip() for line in lines[1:])
+    first_sentence = re.split(r"(?<=[.!?])\s", body, maxsplit=1)[0] if body else ""
+    return heading if not first_sentence else f"{heading}\n{first_sentence} [...]"
+
+
+def fit_context(query: str, upstream: List[Tuple[str, str]], budget: int) -> Tuple[str, dict]:
+    original = CONTEXT_DIVIDER.join(text for _, text in upstream)
+    before = count_tokens(original)
+    stats = {"tokens_before": before, "tokens_after": before, "deduplicated": 0,
+             "summarized": 0, "dropped": 0}
+    if before <= budget:
+        return original, stats
+
+    sections = [(source, section) for source, text in upstream for section in split_sections(text)]
+    unique = deduplicate(sections)
+    stats["deduplicated"] = len(sections) - len(unique)
+    texts = [section for _, section in unique]
+    tokens = [count_tokens(section) for section in texts]
+    # Reserve room for the dividers that join the kept sections back together.
+    total = sum(tokens) + count_tokens(CONTEXT_DIVIDER) * (len(upstream) - 1) + len(texts)
+
+    scores = bm25_scores(query, texts)
+    by_relevance = sorted(range(len(texts)), key=lambda i: (scores[i], i))
+    for i in by_relevance:
+        if total <= budget:
+            break
+        summary = summarize_section(texts[i])
+        summary_tokens = count_tokens(summary)
+        if summary_tokens < tokens[i]:
+            total -= tokens[i] - summary_tokens
+            texts[i], tokens[i] = summary, summary_tokens
+            stats["summarized"] += 1
+    for i in by_relevance:
+        if total <= budget:
+            break
+        if texts[i]:
+            total -= tokens[i]
+            texts[i], tokens[i] = "", 0
+            stats["dropped"] += 1
+
+    blocks = {}
+    for (source, _), text in zip(unique, texts):
+        if text:
+            blocks.setdefault(source, []).append(text)
+    result = CONTEXT_DIVIDER.join("\n\n".join(parts) for parts in blocks.values())
+    stats["tokens_after"] = count_tokens(result)
+    return result, stats
+
+
+def budgeted_context(name: str, query: str, upstream: List[Tuple[str, str]]) -> str:
+    budget = context_budget(name)
+    if budget is None:
+        return CONTEXT_DIVIDER.join(text for _, text in upstream)
+    context, stats = fit_context(query, upstream, budget)
+    stats["task"] = name
+    stats["budget"] = budget
+    saved = stats["tokens_before"] - stats["tokens_after"]
+    if saved > 0:
+        print(f"Context for {name}: {stats['tokens_before']} -> {stats['tokens_after']} tokens "
+              f"(saved {saved}; deduplicated {stats['deduplicated']}, summarized {stats['summarized']}, "
+              f"dropped {stats['dropped']})")
+    return context
+
+
+def task_query(task) -> str:
+    return f"{task.description}\n{task.expected_output}\n{getattr(task, 'brief', '')}"
@@ -0,0 +1,238 @@
+import os
+import re
+import html
+import json
+import hashlib
+import zipfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from cache import cache_from_env
+from tool_registry import function_tool
+from vector_index import VectorIndex
+
+DOCUMENT_CACHE_DIR = ".doc_cache"
+DOCUMENT_INDEX_DIR = ".doc_index"
+DEFAULT_PARSE_WORKERS = 4
+SEARCH_LIMIT = 4
+MAX_READ_CHARS = 20000
+PARSER_VERSION = 2
+DOCUMENT_TYPES = {
+    "txt": (".txt", ".md", ".csv", ".log"),
+    "pdf": (".pdf",),
+    "docx": (".docx",),
+    "json": (".json", ".jsonl"),
+}
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_key(digest: str) -> str:
+    return f"{digest}.v{PARSER_VERSION}"
+
+
+def parse_pdf(path: str) -> str:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def parse_docx(path: str) -> str:
+    with zipfile.ZipFile(path) as archive:
+        xml = archive.read("word/document.xml").decode("utf-8")
+    paragraphs = []
+    for paragraph in re.findall(r"<w:p[ >].*?</w:p>", xml, flags=re.S):
+        text = "".join(html.unescape(run) for run in re.findall(r"<w:t[^>]*>([^<]*)</w:t>", paragraph))
+        if text.strip():
+            paragraphs.append(text)
+    return "\n".join(paragraphs)
+
+
+def parse_json(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = json.load(f)
+    return json.dumps(records, ensure_ascii=False, indent=2)
+
+
+def parse_text(path: str) -> str:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def document_type(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    for kind, extensions in DOCUMENT_TYPES.items():
+        if extension in extensions:
+            return kind
+    return "txt"
+
+
+def parse_document(path: str) -> str:
+    parsers = {"pdf": parse_pdf, "docx": parse_docx, "json": parse_json, "txt": parse_text}
+    return parsers[document_type(path)](path)
+
+
+class DocumentLibrary:
+    def __init__(self, index: VectorIndex = None, workers: int = DEFAULT_PARSE_WORKERS):
+        self.cache = cache_from_env("DOC_CACHE", DOCUMENT_CACHE_DIR)
+        self.index = index or VectorIndex(os.getenv("DOC_INDEX_DIR", DOCUMENT_INDEX_DIR))
+        self.workers = workers
+        self.documents: Dict[str, dict] = {}
+        self.attached: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, path: str, digest: str, text: str) -> dict:
+        source = f"{digest}:{os.path.basename(path)}"
+        self.index.ingest_text(text, source)
+        document = {"path": path, "hash": digest, "type": document_type(path), "source": source}
+        with self._lock:
+            self.documents[os.path.abspath(path)] = document
+        return document
+
+    def ingest(self, paths: List[str]) -> List[dict]:
+        pending = []
+        results = []
+        for path in paths:
+            absolute = os.path.abspath(path)
+            digest = file_hash(absolute)
+            known = self.documents.get(absolute)
+            if known and known["hash"] == digest:
+                results.append(known)
+                continue
+            text = self.cache.get(text_key(digest))
+            if text is None:
+                pending.append((absolute, digest))
+            else:
+                results.append(self._register(absolute, digest, text))
+        if len(pending) == 1:
+            texts = [parse_document(pending[0][0])]
+        elif pending:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as pool:
+                texts = list(pool.map(parse_document, [path for path, _ in pending]))
+        else:
+            texts = []
+        for (path, digest), text in zip(pending, texts):
+            self.cache.set(text_key(digest), text)
+            results.append(self._register(path, digest, text))
+        return results
+
+    def attach(self, paths: List[str]) -> List[dict]:
+        documents = self.ingest(paths)
+        with self._lock:
+            for document in documents:
+                self.attached[document["path"]] = document["hash"]
+        return documents
+
+    def attachment_digests(self) -> List[str]:
+        with self._lock:
+            return sorted(set(self.attached.values()))
+
+    def document(self, path: str) -> dict:
+        absolute = os.path.abspath(path)
+        if absolute not in self.documents:
+            self.ingest([absolute])
+        return self.documents[absolute]
+
+    def read(self, path: str) -> str:
+        document = self.document(path)
+        text = self.cache.get(text_key(document["hash"]))
+        if text is None:
+            text = parse_document(document["path"])
+            self.cache.set(text_key(document["hash"]), text)
+        if len(text) > MAX_READ_CHARS:
+            return text[:MAX_READ_CHARS] + "\n\n[Документ обрезан, используйте поиск по документу...]"
+        return text
+
+    def search(self, query: str, kind: str = None, path: str = None, limit: int = SEARCH_LIMIT) -> str:
+        if path:
+            prefix = self.document(path)["hash"] + ":"
+            source_filter = lambda source: source.startswith(prefix)
+        elif kind:
+            with self._lock:
+                sources = {doc["source"] for doc in self.documents.values() if doc["type"] == kind}
+            source_filter = lambda source: source in sources
+        else:
+            source_filter = None
+        results = self.index.search(query, limit=limit, source_filter=source_filter)
+        if not results:
+            return "Ничего релевантного в документах не найдено."
+        return "\n\n".join(f"[{r['source'].split(':', 1)[1]}, score {r['score']:.2f}]\n{r['text']}"
+                           for r in results)
+
+
+_library: Optional[DocumentLibrary] = None
+_library_lock = threading.Lock()
+
+
+def get_library() -> DocumentLibrary:
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = DocumentLibrary()
+        return _library
+
+
+def attach_documents(paths: List[str]) -> List[dict]:
+    return get_library().attach([path for path in paths if path])
+
+
+def attachment_digests() -> List[str]:
+    with _library_lock:
+        library = _library
+    return library.attachment_digests() if library else []
+
+
+def _search_tool(kind: str, label: str):
+    def search_documents(query: str, path: str = "") -> str:
+        try:
+            return get_library().search(query, kind=kind, path=path or None)
+        except Exception as e:
+            return f"Ошибка при поиске по документам: {str(e)}"
+
+    return function_tool(
+        search_documents,
+        name=f"Search {label} documents",
+        description=f"Semantic search over attached {label} documents. "
+                    f"Pass `path` to search a specific file, otherwise all attached {label} files are searched."
+    )
+
+
+def create_file_read_tool():
+    def read_file(path: str) -> str:
+        try:
+            return get_library().read(path)
+        except Exception as e:
+            return f"Ошибка при чтении файла: {str(e)}"
+
+    return function_tool(
+        read_file,
+        name="Read a file's content",
+        description="Read the extracted text of a TXT, PDF, DOCX or JSON file"
+    )
+
+
+def create_txt_search_tool():
+    return _search_tool("txt", "TXT")
+
+
+def create_pdf_search_tool():
+    return _search_tool("pdf", "PDF")
+
+
+def create_docx_search_tool():
+    return _search_tool("docx", "DOCX")
+
+
+def create_json_search_tool():
+    return _search_tool("json", "JSON")
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque
+
+from common import write_atomic
+
+METRIC_PREFIX = "aiagent"
+MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "100000"))
+
+
+class Tracer:
+    def __init__(self, max_spans: int = MAX_SPANS):
+        self.max_spans = max_spans
+        self.spans: Deque[dict] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = 0
+        self._bound = {}
+        self.epoch = time.time() - time.perf_counter()
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self, kind: str = None):
+        for span in reversed([getattr(self._local, "adopted", None)] + self._stack()):
+            if span and (kind is None or span["kind"] == kind):
+                return span
+        return None
+
+    @contextmanager
+    def bind(self, owner, span: dict):
+        with self._lock:
+            self._bound[id(owner)] = span
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._bound.get(id(owner)) is span:
+                    del self._bound[id(owner)]
+
+    @contextmanager
+    def span(self, kind: str, name: str, owner=None, **attrs):
+        with self._lock:
+            self._ids += 1
+            span_id = self._ids
+            bound = self._bound.get(id(owner)) if owner is not None else None
+        if owner is not None and not self._stack():
+            self._local.adopted = bound
+        parent = self.current()
+        task = parent if parent and parent["kind"] == "task" else self.current("task")
+        span = {
+            "id": span_id,
+            "parent": parent["id"] if parent else None,
+            "kind": kind,
+            "name": name,
+            "task": name if kind == "task" else (task["name"] if task else None),
+            "thread": threading.current_thread().name,
+            "start": time.perf_counter(),
+            "queue_time": 0.0,
+            "prompt_tokens": 0,
+            "cached_prefix_tokens": 0,
+            "completion_tokens": 0,
+            "retries": 0,
+            "cache_hit": False,
+            "error": None,
+        }
+        span.update(attrs)
+        self._stack().append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._stack().pop()
+            span["end"] = time.perf_counter()
+            span["duration"] = span["end"] - span["start"]
+            with self._lock:
+                self.spans.append(span)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans = deque(maxlen=self.max_spans)
+
+    def aggregate(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+        totals = {}
+        for span in spans:
+            key = (span["kind"], span["name"], span["task"] or "")
+            entry = totals.setdefault(key, {"count": 0, "seconds": 0.0, "queue_seconds": 0.0,
+                                            "prompt_tokens": 0, "cached_prefix_tokens": 0, "completion_tokens": 0,
+                                            "retries": 0, "cache_hits": 0, "errors": 0})
+            entry["count"] += 1
+            entry["seconds"] += span["duration"]
+            entry["queue_seconds"] += span["queue_time"]
+            entry["prompt_tokens"] += span["prompt_tokens"]
+            entry["cached_prefix_tokens"] += span["cached_prefix_tokens"]
+            entry["completion_tokens"] += span["completion_tokens"]
+            entry["retries"] += span["retries"]
+            entry["cache_hits"] += int(bool(span["cache_hit"]))
+            entry["errors"] += int(bool(span["error"]))
+        return totals
+
+    def export_json(self, path: str) -> None:
+        with self._lock:
+            spans = [dict(span, start=self.epoch + span["start"], end=self.epoch + span["end"])
+                     for span in self.spans]
+        write_atomic(path, json.dumps({"spans": spans}, ensure_ascii=False, indent=2))
+
+    def export_prometheus(self, path: str) -> None:
+        metrics = [
+            ("span_seconds_total", "counter", "Wall time spent in spans", "seconds"),
+            ("span_queue_seconds_total", "counter", "Time spans waited before starting", "queue_seconds"),
+            ("spans_total", "counter", "Number of completed spans", "count"),
+            ("prompt_tokens_total", "counter", "Prompt tokens sent", "prompt_tokens"),
+            ("cached_prefix_tokens_total", "counter", "Prompt tokens repeating an earlier prompt's prefix",
+             "cached_prefix_tokens"),
+            ("completion_tokens_total", "counter", "Completion tokens received", "completion_tokens"),
+            ("retries_total", "counter", "Retried calls", "retries"),
+            ("cache_hits_total", "counter", "Calls served from a cache", "cache_hits"),
+            ("errors_total", "counter", "Spans that raised", "errors"),
+        ]
+        totals = self.aggregate()
+        lines = []
+        for metric, metric_type, help_text, field in metrics:
+            name = f"{METRIC_PREFIX}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (kind, span_name, task), entry in sorted(totals.items()):
+                labels = f'kind="{_escape(kind)}",name="{_escape(span_name)}",task="{_escape(task)}"'
+                lines.append(f"{name}{{{labels}}} {entry[field]}")
+        write_atomic(path, "\n".join(lines) + "\n")
+
+    def report(self) -> str:
+        totals = self.aggregate()
+        lines = [f"{'kind':<6} {'name':<40} {'task':<36} {'calls':>5} {'seconds':>9} {'tokens in/out':>15} {'cache':>5}"]
+        for (kind, name, task), entry in sorted(totals.items(), key=lambda item: -item[1]["seconds"]):
+            tokens = f"{entry['prompt_tokens']}/{entry['completion_tokens']}"
+            lines.append(f"{kind:<6} {name[:40]:<40} {task[:36]:<36} {entry['count']:>5} "
+                         f"{entry['seconds']:>9.1f} {tokens:>15} {entry['cache_hits']:>5}")
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+tracer = Tracer()
+
+
+def trace_tool(tool, name: str):
+    run = tool._run
+
+    @functools.wraps(run)
+    def traced_run(*args, **kwargs):
+        with tracer.span("tool", name):
+            return run(*args, **kwargs)
+
+    object.__setattr__(tool, "_run", traced_run)
+    return tool
+
+
+def export_traces(directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    tracer.export_json(os.path.join(directory, "trace.json"))
+    tracer.export_prometheus(os.path.join(directory, "metrics.prom"))
@@ -1,7 +1,16 @@
+import os
 from dotenv import load_dotenv
 load_dotenv()
+os.environ.setdefault("LLM_STREAM", "1")
 
-from tasks import create_crew
+from common import env_flag
+from tool_registry import timed, startup_report
+with timed("import tasks"):
+    from tasks import create_crew, run_pipeline, make_topic
+from cache import llm_cache
+from instrumentation import tracer, export_traces
+from streaming import streaming_enabled, stream_to_console
+from rate_limit import exhausted_cause, llm_limiter
 
 def main():
     print("=" * 80)
@@ -24,7 +33,7 @@ def main():
         print("\n Ошибка: Вы не ввели описание бизнес-задачи.")
         return
     
-    topic = user_input[:50] if len(user_input) > 50 else user_input
+    topic = make_topic(user_input)
     
     print(f"\n Бизнес-задача принята: {topic}")
     print("\n Запуск AI-агентов для анализа и создания документации...")
@@ -32,19 +41,63 @@ def main():
     print("=" * 80)
     
     try:
-        crew = create_crew(topic, user_input)
-        result = crew.kickoff()
+        if streaming_enabled():
+            stream_to_console()
+
+        attachments = [path for path in os.getenv("ATTACHMENTS", "").split(os.pathsep) if path]
+        if attachments:
+            from documents import attach_documents
+            with timed("attach documents"):
+                attach_documents(attachments)
+            print(f" Подключено документов: {len(attachments)}")
+
+        if os.getenv("USE_CREW_KICKOFF"):
+            with timed("create_crew"):
+                crew = create_crew(topic, user_input)
+            if os.getenv("STARTUP_REPORT"):
+                print(startup_report())
+            result = crew.kickoff()
+        else:
+            parallel_workers = int(os.getenv("PARALLEL_WORKERS", "1"))
+            bypass_cache = env_flag("PIPELINE_CACHE_BYPASS")
+            result = run_pipeline(topic, user_input, max_workers=parallel_workers, bypass_cache=bypass_cache)
+            if os.getenv("STARTUP_REPORT"):
+                print(startup_report())
         
         print("\n" + "=" * 80)
         print(" Анализ завершен!")
         print("=" * 80)
         print("\n Результаты сохранены в файл: report.txt")
-        print("\nСодержимое отчета:")
-        print("-" * 80)
-        print(result)
-        print("-" * 80)
+        if not streaming_enabled():
+            print("\nСодержимое отчета:")
+            print("-" * 80)
+            print(result)
+            print("-" * 80)
+        stats = llm_cache.stats()
+        print(f"\n Кэш LLM: попаданий {stats['hits']}, промахов {stats['misses']}, "
+              f"доля попаданий {stats['hit_rate']:.0%}")
+        limits = llm_limiter.stats()
+        if limits["rate_limited"]:
+            print(f" Лимиты API: ответов 429 {limits['rate_limited']}, ожидание {limits['waited_seconds']}с")
+        if os.path.exists("report.txt"):
+            from vector_index import get_index
+            try:
+                added = get_index().ingest_file("report.txt")
+                print(f" В базу знаний добавлено фрагментов отчета: {added}")
+            except Exception as e:
+                print(f" Отчет не добавлен в базу знаний: {str(e)}")
+        trace_dir = os.getenv("TRACE_DIR")
+        if trace_dir:
+            export_traces(trace_dir)
+            print(tracer.report())
+            print(f"\n Трассировка сохранена в {trace_dir}/trace.json и {trace_dir}/metrics.prom")
         
     except Exception as e:
+        exhausted = exhausted_cause(e)
+        if exhausted is not None:
+            print(f"\n Превышен лимит запросов к API и повторные попытки не помогли: {str(exhausted)}")
+            print(" Уменьшите PARALLEL_WORKERS или задайте LLM_RPM / LLM_TPM по квоте вашего ключа.")
+            return
         print(f"\n Произошла ошибка: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -0,0 +1,370 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from chunking import count_tokens, truncate_tokens
+from prompts import common_prefix
+
+DEFAULT_HOST = "127.0.0.1"
+SEARCH_PORT = 8765
+LLM_PORT = 8766
+CONFLUENCE_PORT = 8767
+
+
+def _words(seed: str, count: int) -> str:
+    vocabulary = ["bank", "customer", "KYC", "compliance", "risk", "process", "regulation",
+                  "onboarding", "verification", "document", "credit", "scoring", "AML",
+                  "automation", "report", "audit", "identity", "policy", "system", "data"]
+    digest = hashlib.sha256(seed.encode("utf-8")).digest()
+    return " ".join(vocabulary[digest[i % len(digest)] % len(vocabulary)] for i in range(count))
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    rpm_limit = 0
+    rate_window = None
+    rate_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, payload, status: int = 200, headers: dict = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reject_over_limit(self) -> bool:
+        if not self.rpm_limit:
+            return False
+        cls = type(self)
+        now = time.monotonic()
+        with cls.rate_lock:
+            if cls.rate_window is None:
+                cls.rate_window = deque()
+            while cls.rate_window and cls.rate_window[0] <= now - 60:
+                cls.rate_window.popleft()
+            if len(cls.rate_window) < self.rpm_limit:
+                cls.rate_window.append(now)
+                return False
+            wait = cls.rate_window[0] + 60 - now
+        self.read_json()
+        self.send_json({"error": {"message": "Rate limit reached, please retry", "type": "rate_limit_exceeded",
+                                  "code": "rate_limit_exceeded"}},
+                       status=429, headers={"Retry-After": f"{max(wait, 0.1):.1f}"})
+        return True
+
+
+class SearchHandler(JSONHandler):
+    latency = 0.3
+    requests = 0
+
+    def do_POST(self):
+        if self.reject_over_limit():
+            return
+        query = self.read_json().get("query", "")
+        type(self).requests += 1
+        time.sleep(self.latency)
+        results = []
+        for i in range(3):
+            seed = f"{query}:{i}"
+            results.append({
+                "title": f"Result {i + 1} for {query}",
+                "url": f"https://example.com/{hashlib.md5(seed.encode()).hexdigest()[:12]}",
+                "description": _words(seed, 40),
+                "markdown": "\n\n".join(_words(f"{seed}:{p}", 120) for p in range(6)),
+            })
+        self.send_json({"success": True, "data": results})
+
+
+def synthetic_document(seed: str, completion_tokens: int) -> str:
+    sections = [
+        "## Functional Requirements",
+        "\n".join(f"- FR-{i:03d}: The system shall {_words(f'{seed}:fr{i}', 10)}." for i in range(1, 9)),
+        "## Use Cases",
+        "\n".join(f"### UC-{i:03d}: {_words(f'{seed}:uc{i}', 4)}\nTraces: FR-{i:03d}\n"
+                  f"Main flow: {_words(f'{seed}:ucf{i}', 20)}" for i in range(1, 6)),
+        "## User Stories",
+        "\n".join(f"### US-{i:03d}\nAs an analyst, I want {_words(f'{seed}:us{i}', 6)}, "
+                  f"so that {_words(f'{seed}:usb{i}', 6)}.\n"
+                  f"Given {_words(f'{seed}:g{i}', 5)}\nWhen {_words(f'{seed}:w{i}', 5)}\n"
+                  f"Then {_words(f'{seed}:t{i}', 5)}" for i in range(1, 9)),
+        "## Requirements Traceability Matrix",
+        "| Requirement | Use Case | User Story |\n|---|---|---|\n"
+        + "\n".join(f"| FR-{i:03d} | UC-{min(i, 5):03d} | US-{i:03d} |" for i in range(1, 9)),
+        "## Diagrams",
+        "```mermaid\nflowchart TD\n    A[Start] --> B{Check}\n    B -->|ok| C[Approve]\n"
+        "    B -->|fail| D[Reject]\n```",
+    ]
+    document = "\n\n".join(sections)
+    padding = completion_tokens - count_tokens(document)
+    if padding > 0:
+        document += "\n\n## Notes\n" + _words(f"{seed}:notes", padding)
+    return document
+
+
+class LLMHandler(JSONHandler):
+    latency = 0.5
+    tokens_per_second = 200.0
+    completion_tokens = 800
+    stream_chunk_words = 8
+    prefill_tokens_per_second = 0.0
+    prefix_cache_min_tokens = 1024
+    prefix_cache_block = 128
+    prompts = deque(maxlen=512)
+    responses = []
+    stats = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "server_seconds": 0.0}
+    stats_lock = threading.Lock()
+
+    def cached_prefix_tokens(self, prompt: str) -> int:
+        with self.stats_lock:
+            previous = list(self.prompts)
+            self.prompts.append(prompt)
+        length = max((common_prefix(prompt, other) for other in previous), default=0)
+        tokens = count_tokens(prompt[:length])
+        if tokens < self.prefix_cache_min_tokens:
+            return 0
+        return tokens // self.prefix_cache_block * self.prefix_cache_block
+
+    def respond(self, messages: list) -> str:
+        seed = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+        if self.responses:
+            return self.responses[int(seed, 16) % len(self.responses)]
+        return ("Thought: I now can give a great answer\nFinal Answer: "
+                + synthetic_document(seed, self.completion_tokens))
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("chat/completions"):
+            self.send_json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+            return
+        if self.reject_over_limit():
+            return
+        started = time.perf_counter()
+        request = self.read_json()
+        messages = request.get("messages", [])
+        content = self.respond(messages)
+        finish_reason = "stop"
+        limit = request.get("max_completion_tokens") or request.get("max_tokens")
+        if limit and count_tokens(content) > limit:
+            content, finish_reason = truncate_tokens(content, limit), "length"
+        prompt_tokens = count_tokens("\n".join(str(m.get("content", "")) for m in messages))
+        cached_tokens = min(prompt_tokens, self.cached_prefix_tokens(
+            "".join(f"{m.get('role', '')}\n{m.get('content', '')}\n" for m in messages)))
+        completion_tokens = count_tokens(content)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens,
+                 "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+        prefill = (prompt_tokens - cached_tokens) / self.prefill_tokens_per_second \
+            if self.prefill_tokens_per_second else 0.0
+        completion_id = f"chatcmpl-{hashlib.md5(content.encode()).hexdigest()[:16]}"
+        model = request.get("model", "mock")
+        if request.get("stream"):
+            self.stream_completion(completion_id, model, content, usage, prefill, finish_reason)
+        else:
+            time.sleep(self.latency + prefill + completion_tokens / self.tokens_per_second)
+            self.send_json({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": finish_reason,
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": usage,
+            })
+        with self.stats_lock:
+            type(self).stats["requests"] += 1
+            type(self).stats["prompt_tokens"] += prompt_tokens
+            type(self).stats["cached_tokens"] += cached_tokens
+            type(self).stats["completion_tokens"] += completion_tokens
+            type(self).stats["server_seconds"] += time.perf_counter() - started
+
+    def stream_completion(self, completion_id: str, model: str, content: str, usage: dict,
+                          prefill: float = 0.0, finish_reason: str = "stop") -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(choices: list, **extra) -> None:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": choices, **extra}
+            self.wfile.write(b"data: " + json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        time.sleep(self.latency + prefill)
+        words = content.split(" ")
+        for start in range(0, len(words), self.stream_chunk_words):
+            piece = " ".join(words[start:start + self.stream_chunk_words])
+            if start + self.stream_chunk_words < len(words):
+                piece += " "
+            time.sleep(count_tokens(piece) / self.tokens_per_second)
+            event([{"index": 0, "finish_reason": None, "delta": {"role": "assistant", "content": piece}}])
+        event([{"index": 0, "finish_reason": finish_reason, "delta": {}}])
+        event([], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        with cls.stats_lock:
+            cls.stats = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+                         "server_seconds": 0.0}
+            cls.prompts.clear()
+
+
+def offline_environment(llm_url: str, search_url: str) -> None:
+    os.environ["LLM_BASE_URL"] = llm_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    os.environ["SEARCH_API_URL"] = search_url
+    os.environ["LLM_CACHE_DISABLED"] = "1"
+    os.environ["TASK_STORE_DISABLED"] = "1"
+    os.environ["PIPELINE_CACHE_DISABLED"] = "1"
+    os.environ["ROUTING_STATS_DISABLED"] = "1"
+    os.environ.pop("CONFLUENCE_URL", None)
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+    os.environ.setdefault("EC_TELEMETRY", "false")
+
+
+def start_server(handler_class, host: str = DEFAULT_HOST, port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_url(server: ThreadingHTTPServer, path: str = "") -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{path}"
+
+
+class ConfluenceHandler(JSONHandler):
+    latency = 0.05
+    pages = {}
+    stats = {"created": 0, "updated": 0}
+    stats_lock = threading.Lock()
+
+    def page_id(self):
+        parts = [part for part in urlsplit(self.path).path.split("/") if part]
+        if parts[:3] != ["rest", "api", "content"]:
+            return None
+        return parts[3] if len(parts) > 3 else ""
+
+    def summary(self, page: dict) -> dict:
+        return {key: page[key] for key in ("id", "type", "title", "space", "version", "ancestors")}
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        page_id = self.page_id()
+        if page_id is None:
+            self.send_json({"message": f"Unknown path {self.path}"}, status=404)
+        elif page_id:
+            page = self.pages.get(page_id)
+            if page is None:
+                self.send_json({"message": f"No content with id {page_id}"}, status=404)
+            else:
+                self.send_json(page)
+        else:
+            query = parse_qs(urlsplit(self.path).query)
+            title, space = query.get("title", [None])[0], query.get("spaceKey", [None])[0]
+            with self.stats_lock:
+                found = [self.summary(page) for page in self.pages.values()
+                         if page["title"] == title and page["space"]["key"] == space]
+            self.send_json({"results": found, "size": len(found)})
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        payload = self.read_json()
+        with self.stats_lock:
+            if any(page["title"] == payload.get("title") and page["space"] == payload.get("space")
+                   for page in self.pages.values()):
+                self.send_json({"message": "A page with this title already exists"}, status=400)
+                return
+            page_id = str(100000 + len(self.pages))
+            page = self.pages[page_id] = {"ancestors": [], **payload, "id": page_id, "type": "page",
+                                          "version": {"number": 1}}
+            type(self).stats["created"] += 1
+        self.send_json(page)
+
+    def do_PUT(self):
+        time.sleep(self.latency)
+        payload = self.read_json()
+        page_id = self.page_id()
+        with self.stats_lock:
+            page = self.pages.get(page_id)
+            if page is None:
+                self.send_json({"message": f"No content with id {page_id}"}, status=404)
+                return
+            expected = page["version"]["number"] + 1
+            if payload.get("version", {}).get("number") != expected:
+                self.send_json({"message": f"Version must be {expected}"}, status=409)
+                return
+            page.update(payload)
+            type(self).stats["updated"] += 1
+        self.send_json(page)
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        with cls.stats_lock:
+            cls.pages.clear()
+            cls.stats = {"created": 0, "updated": 0}
+
+
+HANDLERS = {
+    "search": (SearchHandler, SEARCH_PORT),
+    "llm": (LLMHandler, LLM_PORT),
+    "confluence": (ConfluenceHandler, CONFLUENCE_PORT),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in servers for offline runs")
+    parser.add_argument("kind", choices=sorted(HANDLERS))
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=LLMHandler.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=LLMHandler.completion_tokens)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=0.0,
+                        help="model prompt processing time for tokens not served from the prefix cache (llm only)")
+    parser.add_argument("--rpm", type=int, default=0, help="answer 429 above this many requests per minute")
+    parser.add_argument("--responses", help="JSON list of recorded responses to replay (llm only)")
+    args = parser.parse_args(argv)
+    handler_class, default_port = HANDLERS[args.kind]
+    handler_class.latency = args.latency
+    handler_class.rpm_limit = args.rpm
+    if args.kind == "llm":
+        LLMHandler.tokens_per_second = args.tokens_per_second
+        LLMHandler.completion_tokens = args.completion_tokens
+        LLMHandler.prefill_tokens_per_second = args.prefill_tokens_per_second
+        if args.responses:
+            with open(args.responses, encoding="utf-8") as f:
+                LLMHandler.responses = json.load(f)
+    server = ThreadingHTTPServer((args.host, args.port or default_port), handler_class)
+    print(f"{args.kind} stand-in listening on {server_url(server)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
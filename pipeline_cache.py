@@ -0,0 +1,96 @@
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from cache import DiskCache, cache_from_env, content_key
+from common import env_flag
+from instrumentation import tracer
+from task_store import agent_definition
+
+PIPELINE_CACHE_DIR = ".pipeline_cache"
+GENERIC_PREFIXES = (
+    "улучш", "оптимиз", "повыш", "повыс", "соверш", "доработ",
+    "improv", "optimi", "enhanc",
+)
+NEGATIONS = {"не", "ни", "нет", "без", "no", "not", "non", "without"}
+
+
+def normalize_problem(text: str) -> str:
+    terms = Counter()
+    negation = ""
+    for word in re.findall(r"\w+", text.casefold()):
+        if word in NEGATIONS:
+            negation += word + "_"
+            continue
+        if word.startswith(GENERIC_PREFIXES) and not negation:
+            continue
+        terms[negation + word] += 1
+        negation = ""
+    if negation:
+        terms[negation.rstrip("_")] += 1
+    return " ".join(term for term in sorted(terms) for _ in range(terms[term]))
+
+
+def pipeline_definition(tasks, routes: Dict[str, List[dict]] = None) -> str:
+    return content_key(
+        [[task.name, task.description, task.expected_output, agent_definition(task.agent)] for task in tasks],
+        routes or {},
+    )
+
+
+def adapt_artifacts(artifacts: Dict[str, str], cached_topic: str, topic: str) -> Dict[str, str]:
+    if not cached_topic or cached_topic == topic:
+        return dict(artifacts)
+    return {name: raw.replace(cached_topic, topic) for name, raw in artifacts.items()}
+
+
+class PipelineCache:
+    def __init__(self, cache: DiskCache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, user_input: str, attachments: List[str] = (), definition: str = "") -> Optional[str]:
+        normalized = normalize_problem(user_input)
+        return content_key(normalized, sorted(attachments), definition) if normalized else None
+
+    def lookup(self, user_input: str, attachments: List[str] = (), definition: str = "") -> Optional[dict]:
+        key = self.key(user_input, attachments, definition)
+        with tracer.span("pipeline_cache", "lookup") as span:
+            entry = self.cache.get(key) if key else None
+            span["cache_hit"] = entry is not None
+            with self._lock:
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        return entry
+
+    def save(self, user_input: str, topic: str, final_task: str, artifacts: Dict[str, str],
+             attachments: List[str] = (), definition: str = "") -> None:
+        key = self.key(user_input, attachments, definition)
+        if not key or self.cache.read_only:
+            return
+        self.cache.set(key, {"user_input": user_input, "topic": topic, "normalized": normalize_problem(user_input),
+                             "attachments": sorted(attachments), "final_task": final_task,
+                             "artifacts": artifacts})
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_pipeline_cache() -> Optional[PipelineCache]:
+    global _default_cache
+    if env_flag("PIPELINE_CACHE_DISABLED"):
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PipelineCache(cache_from_env("PIPELINE_CACHE", PIPELINE_CACHE_DIR))
+        return _default_cache
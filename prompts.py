@@ -0,0 +1,54 @@
+import os
+import threading
+from collections import deque
+from typing import Dict
+
+from chunking import count_tokens
+from context_budget import CONTEXT_DIVIDER
+
+PREFIX_HISTORY = 256
+PROJECT_BRIEF = "PROJECT BRIEF\n- Topic: {topic}"
+USER_INPUT_LINE = "\n- Business need as stated by the user: {user_input}"
+
+
+def project_brief(topic: str, user_input: str = None) -> str:
+    brief = PROJECT_BRIEF.format(topic=topic)
+    return brief + USER_INPUT_LINE.format(user_input=user_input) if user_input else brief
+
+
+def append_brief(context: str, task) -> str:
+    brief = getattr(task, "brief", "")
+    if not brief:
+        return context
+    return f"{context}{CONTEXT_DIVIDER}{brief}" if context else brief
+
+
+def common_prefix(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    if a[:limit] == b[:limit]:
+        return limit
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class PrefixTracker:
+    def __init__(self, history: int = PREFIX_HISTORY):
+        self.history: Dict[str, deque] = {}
+        self.size = history
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, prompt: str) -> int:
+        with self._lock:
+            previous = list(self.history.setdefault(model, deque(maxlen=self.size)))
+            self.history[model].append(prompt)
+        length = max((common_prefix(prompt, other) for other in previous), default=0)
+        return count_tokens(prompt[:length])
+
+
+prefix_tracker = PrefixTracker(int(os.getenv("PREFIX_HISTORY", PREFIX_HISTORY)))
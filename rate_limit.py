@@ -0,0 +1,204 @@
+import os
+import time
+import heapq
+import random
+import itertools
+import threading
+from typing import Callable, Optional
+
+from instrumentation import tracer
+
+DEFAULT_LLM_RPM = 500
+DEFAULT_LLM_TPM = 200000
+DEFAULT_MAX_RETRIES = 6
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+MIN_RATE_FACTOR = 0.1
+RECOVERY_STEP = 0.05
+
+
+# Subclasses TimeoutError so crewai propagates it instead of re-running the task (max_retry_limit):
+# the retries in RateLimiter.call are the whole wait budget.
+class RateLimitExhausted(TimeoutError):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.per_second = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float, factor: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_second * factor)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float, factor: float) -> float:
+        self._refill(now, factor)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / (self.per_second * factor)
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+def error_chain(error: BaseException):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    for candidate in error_chain(error):
+        status = getattr(candidate, "status_code", None) or getattr(candidate, "code", None)
+        response = getattr(candidate, "response", None)
+        if status == 429 or getattr(response, "status_code", None) == 429:
+            return True
+        if any(cls.__name__ == "RateLimitError" for cls in type(candidate).__mro__):
+            return True
+    return False
+
+
+def exhausted_cause(error: BaseException) -> Optional[RateLimitExhausted]:
+    return next((candidate for candidate in error_chain(error) if isinstance(candidate, RateLimitExhausted)),
+                None)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def current_priority() -> int:
+    span = tracer.current("task")
+    return -span.get("position", 0) if span else 0
+
+
+class RateLimiter:
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0, max_retries: int = DEFAULT_MAX_RETRIES):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_retries = max_retries
+        self.factor = 1.0
+        self.blocked_until = 0.0
+        self.waited = 0.0
+        self.rate_limited = 0
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    def set_share(self, share: float) -> None:
+        with self._cond:
+            self.requests = TokenBucket(self.rpm * share) if self.rpm else None
+            self.tokens = TokenBucket(self.tpm * share) if self.tpm else None
+            self._cond.notify_all()
+
+    def _delay(self, tokens: float, now: float) -> float:
+        delays = [self.blocked_until - now]
+        if self.requests:
+            delays.append(self.requests.wait_time(1, now, self.factor))
+        if self.tokens and tokens:
+            delays.append(self.tokens.wait_time(tokens, now, self.factor))
+        return max(delays)
+
+    def acquire(self, tokens: float = 0, priority: int = 0) -> float:
+        started = time.monotonic()
+        entry = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    if self._waiters[0] != entry:
+                        self._cond.wait()
+                        continue
+                    delay = self._delay(tokens, time.monotonic())
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if self.requests:
+                    self.requests.take(1)
+                if self.tokens and tokens:
+                    self.tokens.take(tokens)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            self.waited += waited
+        return waited
+
+    def settle(self, reserved: float, used: float) -> None:
+        if self.tokens and reserved > used:
+            with self._cond:
+                self.tokens.refund(reserved - used)
+                self._cond.notify_all()
+
+    def penalize(self, delay: float) -> None:
+        with self._cond:
+            self.rate_limited += 1
+            self.factor = max(MIN_RATE_FACTOR, self.factor / 2)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            self._cond.notify_all()
+
+    def recover(self) -> None:
+        if self.factor < 1.0:
+            with self._cond:
+                self.factor = min(1.0, self.factor + RECOVERY_STEP)
+
+    def call(self, func: Callable, tokens: float = 0, priority: Optional[int] = None):
+        priority = current_priority() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens, priority)
+            try:
+                result = func()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                if attempt == self.max_retries:
+                    raise RateLimitExhausted(
+                        f"{self.name}: rate limited {attempt + 1} times in a row, giving up") from e
+                suggested = retry_after(e)
+                if suggested is not None:
+                    delay = suggested * random.uniform(1.0, 1.25)
+                else:
+                    delay = min(MAX_DELAY, BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.5)
+                self.penalize(delay)
+                span = tracer.current()
+                if span:
+                    span["retries"] += 1
+                continue
+            self.recover()
+            return result
+
+    def stats(self) -> dict:
+        return {"rate_limited": self.rate_limited, "waited_seconds": round(self.waited, 2),
+                "rate_factor": round(self.factor, 2)}
+
+
+def _limit(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+llm_limiter = RateLimiter("llm", rpm=_limit("LLM_RPM", DEFAULT_LLM_RPM), tpm=_limit("LLM_TPM", DEFAULT_LLM_TPM))
+search_limiter = RateLimiter("search", rpm=_limit("SEARCH_RPM", 0))
+
+
+def share_limits(processes: int) -> None:
+    for limiter in (llm_limiter, search_limiter):
+        limiter.set_share(1 / max(1, processes))
@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from common import env_flag, write_atomic
+from validators import produced_outputs, validate_outputs
+
+DEFAULT_MODEL = "gpt-4o-mini"
+ROUTING_CONFIG = "routing.json"
+ROUTING_STATS = ".routing_stats.json"
+ROUTE_WINDOW = 20
+MIN_SAMPLES = 3
+MIN_PASS_RATE = 0.9
+BLOCKING_SEVERITIES = ("critical", "high")
+ANALYTICAL_ROUTE = {"max_tokens": None, "max_iter": 3, "max_execution_time": 300}
+DEFAULT_ROUTES = {
+    "collect_requirements_dialogue": {"max_tokens": None, "max_iter": 5, "max_execution_time": 600},
+    "gather_business_text": ANALYTICAL_ROUTE,
+    "extract_requirements": ANALYTICAL_ROUTE,
+    "generate_use_cases_and_user_stories": {"max_tokens": None, "max_iter": 3, "max_execution_time": 600},
+    "create_process_diagrams": ANALYTICAL_ROUTE,
+    "validate_requirements_quality": ANALYTICAL_ROUTE,
+    "publish_to_confluence": {"max_tokens": None, "max_iter": 2, "max_execution_time": 180},
+}
+
+
+def route_id(route: dict) -> str:
+    return f"{route['model']}/{route['max_tokens'] or '-'}/{route['max_iter']}/{route['max_execution_time']}s"
+
+
+def complete_route(task: str, route: dict) -> dict:
+    defaults = DEFAULT_ROUTES.get(task, ANALYTICAL_ROUTE)
+    return {
+        "model": route.get("model") or DEFAULT_MODEL,
+        "max_tokens": route.get("max_tokens", defaults["max_tokens"]),
+        "max_iter": route.get("max_iter", defaults["max_iter"]),
+        "max_execution_time": route.get("max_execution_time", defaults["max_execution_time"]),
+    }
+
+
+def load_config(path: str) -> Dict[str, List[dict]]:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    routes = {}
+    for task, value in config.get("tasks", config).items():
+        routes[task] = value if isinstance(value, list) else [value]
+    return routes
+
+
+class Router:
+    def __init__(self, config: Dict[str, List[dict]] = None, stats_path: Optional[str] = ROUTING_STATS):
+        self.config = config or {}
+        self.stats_path = stats_path
+        self._lock = threading.Lock()
+
+    def candidates(self, task: str) -> List[dict]:
+        routes = [complete_route(task, route) for route in self.config.get(task) or [{}]]
+        if routes[-1]["max_tokens"]:
+            routes.append(dict(routes[-1], max_tokens=None))
+        return routes
+
+    def _read_stats(self) -> dict:
+        if not self.stats_path:
+            return {}
+        try:
+            with open(self.stats_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def outcomes(self, task: str, route: dict, stats: dict = None) -> List[list]:
+        stats = self._read_stats() if stats is None else stats
+        return stats.get(task, {}).get(route_id(route), [])
+
+    def select(self, task: str) -> dict:
+        candidates = self.candidates(task)
+        stats = self._read_stats()
+        for route in candidates[:-1]:
+            outcomes = self.outcomes(task, route, stats)
+            if len(outcomes) < MIN_SAMPLES:
+                return route
+            if sum(passed for passed, _ in outcomes) / len(outcomes) >= MIN_PASS_RATE:
+                return route
+        return candidates[-1]
+
+    @contextmanager
+    def _stats_lock(self):
+        with self._lock, open(self.stats_path + ".lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def record(self, results: List[tuple]) -> None:
+        if not self.stats_path or not results:
+            return
+        with self._stats_lock():
+            stats = self._read_stats()
+            for task, route, seconds, passed in results:
+                history = stats.setdefault(task, {}).setdefault(route_id(route), [])
+                history.append([bool(passed), round(seconds, 2) if seconds is not None else None])
+                del history[:-ROUTE_WINDOW]
+            write_atomic(self.stats_path, json.dumps(stats, ensure_ascii=False))
+
+    def record_pipeline(self, tasks, timings: dict, outputs: dict) -> None:
+        issues, _ = validate_outputs(produced_outputs({name: output.raw for name, output in outputs.items()}))
+        failed = {item["source"] for item in issues if item["severity"] in BLOCKING_SEVERITIES}
+        results = []
+        for task in tasks:
+            timing = timings.get(task.name)
+            if not task.route or not timing or timing["cached"]:
+                continue
+            passed = (task.name not in failed and not timing.get("truncated")
+                      and bool(outputs[task.name].raw.strip()))
+            results.append((task.name, task.route, timing["duration"], passed))
+        self.record(results)
+
+    def record_failure(self, tasks, names: List[str]) -> None:
+        self.record([(task.name, task.route, None, False) for task in tasks if task.name in names and task.route])
+
+    def report(self) -> str:
+        stats = self._read_stats()
+        lines = []
+        for task in DEFAULT_ROUTES:
+            selected = route_id(self.select(task))
+            for route in self.candidates(task):
+                outcomes = self.outcomes(task, route, stats)
+                seconds = [value for _, value in outcomes if value is not None]
+                rate = f"{sum(passed for passed, _ in outcomes) / len(outcomes):.0%}" if outcomes else "-"
+                latency = f"{sum(seconds) / len(seconds):.1f}s" if seconds else "-"
+                marker = "*" if route_id(route) == selected else " "
+                lines.append(f"{marker} {task:<38} {route_id(route):<36} runs {len(outcomes):>3}  "
+                             f"passed {rate:>4}  avg {latency:>7}")
+        return "\n".join(lines)
+
+
+_default_router = None
+
+
+def default_router() -> Router:
+    global _default_router
+    if _default_router is None:
+        disabled = env_flag("ROUTING_STATS_DISABLED")
+        _default_router = Router(load_config(os.getenv("ROUTING_CONFIG", ROUTING_CONFIG)),
+                                 None if disabled else os.getenv("ROUTING_STATS", ROUTING_STATS))
+    return _default_router
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show per-task routes, their history and the current choice")
+    parser.add_argument("--config", default=os.getenv("ROUTING_CONFIG", ROUTING_CONFIG))
+    parser.add_argument("--stats", default=os.getenv("ROUTING_STATS", ROUTING_STATS))
+    args = parser.parse_args(argv)
+    print(Router(load_config(args.config), args.stats).report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
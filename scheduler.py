@@ -0,0 +1,255 @@
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from context_budget import CONTEXT_DIVIDER, budgeted_context, task_query
+from validators import local_validation
+from prompts import append_brief
+from task_store import task_key
+from instrumentation import tracer
+from streaming import close_section_stream, open_section_stream, select_sections, watch_sections
+
+DEFAULT_MAX_WORKERS = 3
+
+
+def task_name(task) -> str:
+    name = getattr(task, "name", None)
+    if name:
+        return name
+    return task.description.strip().splitlines()[0][:60]
+
+
+def task_dependencies(task) -> list:
+    context = getattr(task, "context", None)
+    if not isinstance(context, list):
+        return []
+    return context
+
+
+def build_graph(tasks: list) -> Dict[str, List[str]]:
+    names = {id(task): task_name(task) for task in tasks}
+    graph = {}
+    for task in tasks:
+        deps = []
+        for dep in task_dependencies(task):
+            if id(dep) not in names:
+                raise ValueError(f"Task '{task_name(task)}' depends on a task outside the graph")
+            deps.append(names[id(dep)])
+        graph[names[id(task)]] = deps
+    return graph
+
+
+def topological_order(graph: Dict[str, List[str]]) -> List[str]:
+    order = []
+    state = {}
+
+    def visit(name):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Cycle detected in task graph at '{name}'")
+        state[name] = "visiting"
+        for dep in graph[name]:
+            visit(dep)
+        state[name] = "done"
+        order.append(name)
+
+    for name in graph:
+        visit(name)
+    return order
+
+
+def critical_path(graph: Dict[str, List[str]], durations: Dict[str, float],
+                  lags: Dict[Tuple[str, str], float] = None):
+    lags = lags or {}
+    start = {}
+    finish = {}
+    previous = {}
+    for name in topological_order(graph):
+        def ready(dep):
+            return start[dep] + lags[name, dep] if (name, dep) in lags else finish[dep]
+
+        best_dep = max(graph[name], key=ready, default=None)
+        start[name] = ready(best_dep) if best_dep else 0.0
+        finish[name] = start[name] + durations.get(name, 0.0)
+        previous[name] = best_dep
+    if not finish:
+        return [], 0.0
+    node = max(finish, key=finish.get)
+    total = finish[node]
+    path = []
+    while node:
+        path.append(node)
+        node = previous[node]
+    return list(reversed(path)), total
+
+
+def task_context(task, upstream: List[Tuple[str, str]]) -> str:
+    name = task_name(task)
+    context = budgeted_context(name, task_query(task), upstream)
+    report = local_validation(name, upstream)
+    if report is not None:
+        context = report + CONTEXT_DIVIDER + context
+    return append_brief(context, task)
+
+
+def build_context(task, upstream: Dict[str, str]) -> str:
+    return task_context(task, [(task_name(dep), upstream[task_name(dep)]) for dep in task_dependencies(task)])
+
+
+def execute_task(task, context: str):
+    return task.execute_sync(agent=task.agent, context=context, tools=task.agent.tools)
+
+
+class TaskScheduler:
+    def __init__(self, tasks: list, max_workers: int = DEFAULT_MAX_WORKERS,
+                 on_complete: Optional[Callable] = None, store=None, pipelined: bool = False,
+                 attachments: List[str] = ()):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.tasks = {task_name(task): task for task in tasks}
+        self.positions = {task_name(task): position for position, task in enumerate(tasks)}
+        self.graph = build_graph(tasks)
+        topological_order(self.graph)
+        self.max_workers = max_workers
+        self.on_complete = on_complete
+        self.store = store
+        self.pipelined = pipelined and max_workers > 1
+        self.attachments = list(attachments)
+        self.outputs = {}
+        self.timings = {}
+        self.failed = []
+        self.streams = {}
+        self._signal = Future()
+        self._lock = threading.Lock()
+        if self.pipelined:
+            watch_sections()
+
+    def _notify(self) -> None:
+        with self._lock:
+            if not self._signal.done():
+                self._signal.set_result(None)
+
+    def _upstream(self, name: str) -> Optional[Dict[str, str]]:
+        subscriptions = (getattr(self.tasks[name], "sections", None) or {}) if self.pipelined else {}
+        upstream = {}
+        for dep in self.graph[name]:
+            names = subscriptions.get(dep)
+            if dep in self.outputs:
+                upstream[dep] = self.outputs[dep].raw
+                continue
+            stream = self.streams.get(dep)
+            text = select_sections(stream.final_answer(), names, complete=False) if names and stream else None
+            if not text:
+                return None
+            upstream[dep] = text
+        return upstream
+
+    def _owners(self, name: str) -> set:
+        agent = self.tasks[name].agent
+        llm = getattr(agent, "llm", None)
+        return {id(agent)} | ({id(llm)} if llm is not None else set())
+
+    def _busy(self, name: str, running) -> bool:
+        owners = self._owners(name)
+        return any(owners & self._owners(other) for other in running)
+
+    def _run_one(self, name: str, upstream: Dict[str, str], ready_at: float, early: List[str]):
+        task = self.tasks[name]
+        started = time.perf_counter()
+        with tracer.span("task", name, queue_time=started - ready_at, agent=task.agent.role,
+                         position=self.positions[name], early_start=early) as span:
+            key = task_key(task, list(upstream.values()), self.attachments) if self.store else None
+            output = self.store.load(task, key) if self.store else None
+            cached = span["cache_hit"] = output is not None
+            if not cached:
+                if self.pipelined:
+                    self.streams[name] = open_section_stream(span["id"], self._notify)
+                try:
+                    with tracer.bind(task.agent.llm, span):
+                        output = execute_task(task, build_context(task, upstream))
+                finally:
+                    close_section_stream(span["id"])
+                if self.store:
+                    self.store.save(key, output)
+        finished = time.perf_counter()
+        with self._lock:
+            self.timings[name] = {
+                "ready": ready_at,
+                "start": started,
+                "end": finished,
+                "queued": started - ready_at,
+                "duration": finished - started,
+                "cached": cached,
+                "truncated": bool(span.get("truncated")),
+                "early": early,
+            }
+        return output
+
+    def run(self) -> dict:
+        self._started = time.perf_counter()
+        pending = dict(self.graph)
+        running = {}
+        ready_at = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                now = time.perf_counter()
+                for name in list(pending):
+                    upstream = self._upstream(name)
+                    if upstream is None:
+                        continue
+                    ready_at.setdefault(name, now)
+                    if len(running) >= self.max_workers or self._busy(name, running.values()):
+                        continue
+                    del pending[name]
+                    early = [dep for dep in self.graph[name] if dep not in self.outputs]
+                    running[pool.submit(self._run_one, name, upstream, ready_at[name], early)] = name
+                if not running:
+                    raise RuntimeError(f"Unresolvable dependencies for tasks: {', '.join(pending)}")
+                with self._lock:
+                    signal = self._signal
+                done, _ = wait(list(running) + [signal], return_when=FIRST_COMPLETED)
+                with self._lock:
+                    if self._signal.done():
+                        self._signal = Future()
+                for future in done:
+                    name = running.pop(future, None)
+                    if name is None:
+                        continue
+                    try:
+                        self.outputs[name] = future.result()
+                    except Exception:
+                        self.failed.append(name)
+                        raise
+                    finally:
+                        self.streams.pop(name, None)
+                    if self.on_complete:
+                        self.on_complete(name, self.outputs[name])
+        self._finished = time.perf_counter()
+        return self.outputs
+
+    def critical_path(self):
+        durations = {name: timing["duration"] for name, timing in self.timings.items()}
+        lags = {(name, dep): timing["start"] - self.timings[dep]["start"]
+                for name, timing in self.timings.items() for dep in timing.get("early", ())
+                if dep in self.timings}
+        return critical_path(self.graph, durations, lags)
+
+    def report(self) -> str:
+        path, path_time = self.critical_path()
+        wall = self._finished - self._started
+        busy = sum(timing["duration"] for timing in self.timings.values())
+        lines = [f"Wall time: {wall:.1f}s (sum of task time {busy:.1f}s, workers {self.max_workers})"]
+        for name in topological_order(self.graph):
+            timing = self.timings.get(name)
+            if not timing:
+                continue
+            lines.append(
+                f"  {name:<40} start {timing['start'] - self._started:7.1f}s "
+                f"queued {timing['queued']:6.1f}s duration {timing['duration']:7.1f}s"
+                + (" (stored)" if timing.get("cached") else "")
+                + (f" (started on sections of {', '.join(timing['early'])})" if timing.get("early") else "")
+            )
+        lines.append(f"Critical path ({path_time:.1f}s): {' -> '.join(path)}")
+        return "\n".join(lines)
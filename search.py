@@ -0,0 +1,122 @@
+import os
+import re
+import json
+import time
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from instrumentation import tracer
+from rate_limit import search_limiter
+
+SEARCH_CACHE_TTL = 3600
+SEARCH_CACHE_MAX_ENTRIES = 1024
+SEARCH_TIMEOUT = 60
+
+
+def normalize_query(query: str) -> str:
+    query = re.sub(r"\s+", " ", query.casefold()).strip()
+    return query.strip(" .,;:!?\"'")
+
+
+def firecrawl_backend() -> Callable[[str], str]:
+    from crewai_tools import FirecrawlSearchTool
+
+    tool = FirecrawlSearchTool(
+        api_key=os.getenv("FIRECRAWL_API_KEY"),
+        limit=1,
+        fetchPageContent=False
+    )
+
+    def run(query: str) -> str:
+        result = tool._run(query)
+        return result if isinstance(result, str) else str(result)
+    return run
+
+
+def http_backend(url: str) -> Callable[[str], str]:
+    def run(query: str) -> str:
+        request = urllib.request.Request(
+            url,
+            data=json.dumps({"query": query, "limit": 1}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=SEARCH_TIMEOUT) as response:
+            return response.read().decode("utf-8")
+    return run
+
+
+def _mark_cache_hit() -> None:
+    span = tracer.current("tool")
+    if span:
+        span["cache_hit"] = True
+
+
+class SearchClient:
+    def __init__(self, backend: Callable[[str], str], ttl: float = SEARCH_CACHE_TTL,
+                 max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def search(self, query: str) -> str:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                self.hits += 1
+                _mark_cache_hit()
+                return entry[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.collapsed += 1
+        if not leader:
+            _mark_cache_hit()
+            return future.result()
+        try:
+            result = search_limiter.call(lambda: self.backend(query))
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._cache[key] = (time.monotonic() + self.ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        future.set_result(result)
+        return result
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "collapsed": self.collapsed,
+                "entries": len(self._cache)}
+
+
+_client: Optional[SearchClient] = None
+_client_lock = threading.Lock()
+
+
+def get_search_client() -> SearchClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            url = os.getenv("SEARCH_API_URL")
+            backend = http_backend(url) if url else firecrawl_backend()
+            _client = SearchClient(backend, ttl=float(os.getenv("SEARCH_CACHE_TTL", SEARCH_CACHE_TTL)))
+        return _client
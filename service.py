@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_OUTPUT_DIR = "jobs"
+MAX_FINISHED_JOBS = 1000
+MAX_BODY_BYTES = 1024 * 1024
+DEFAULT_RETRY_AFTER = 60
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+def warm_up_crew() -> float:
+    started = time.perf_counter()
+    from tasks import create_tasks, make_topic
+
+    create_tasks(make_topic("warm-up"), "warm-up", output_file=None)
+    return time.perf_counter() - started
+
+
+class AnalystService:
+    def __init__(self, workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 output_dir: str = DEFAULT_OUTPUT_DIR, task_workers: int = 1):
+        if workers < 1 or queue_size < 1:
+            raise ValueError("workers and queue_size must be at least 1")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.output_dir = output_dir
+        self.task_workers = task_workers
+        self.jobs: Dict[str, dict] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crew")
+        self._lock = threading.Lock()
+        self._durations = []
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        os.makedirs(self.output_dir, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        warm_seconds = await loop.run_in_executor(self.executor, warm_up_crew)
+        print(f"Агенты и инструменты загружены за {warm_seconds:.1f}с")
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        for _ in range(self.workers):
+            loop.create_task(self._worker())
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                await loop.run_in_executor(self.executor, self.run_job, job)
+            finally:
+                self.queue.task_done()
+
+    def run_job(self, job: dict) -> None:
+        from tasks import make_topic, run_pipeline
+
+        job["status"] = "running"
+        job["started_at"] = time.time()
+
+        def task_done(name, output):
+            job["artifacts"][name] = output.raw
+
+        try:
+            run_pipeline(make_topic(job["problem"]), job["problem"], max_workers=self.task_workers,
+                         output_file=job["report"], on_complete=task_done,
+                         bypass_cache=job["bypass_cache"])
+            job["status"] = "done"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = f"{type(e).__name__}: {e}"
+        job["finished_at"] = time.time()
+        with self._lock:
+            self._durations = (self._durations + [job["finished_at"] - job["started_at"]])[-50:]
+            self._forget_old_jobs()
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job for job in self.jobs.values() if job["status"] in ("done", "failed")]
+        for job in sorted(finished, key=lambda item: item["finished_at"])[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job["id"]]
+
+    def retry_after(self) -> int:
+        with self._lock:
+            durations = list(self._durations)
+        if not durations:
+            return DEFAULT_RETRY_AFTER
+        return max(1, int(sum(durations) / len(durations) * self.queue.qsize() / self.workers))
+
+    def submit(self, payload: dict):
+        problem = str(payload.get("problem") or payload.get("user_input") or "").strip()
+        if not problem:
+            return 400, {"error": "Field 'problem' is required"}
+        if self.queue.full():
+            return 429, {"error": "Queue is full", "retry_after": self.retry_after()}
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "problem": problem,
+            "bypass_cache": bool(payload.get("bypass_cache")),
+            "status": "queued",
+            "error": None,
+            "queued_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "report": os.path.join(self.output_dir, f"{job_id}.md"),
+            "artifacts": {},
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+        self.queue.put_nowait(job)
+        return 202, self.describe(job)
+
+    def describe(self, job: dict) -> dict:
+        summary = {key: value for key, value in job.items() if key not in ("artifacts", "report")}
+        summary["completed_tasks"] = list(job["artifacts"])
+        summary["position"] = None
+        if job["status"] == "queued":
+            summary["position"] = sum(1 for other in list(self.jobs.values())
+                                      if other["status"] == "queued" and other["queued_at"] <= job["queued_at"])
+        end = job["finished_at"] or time.time()
+        summary["seconds"] = round(end - job["started_at"], 2) if job["started_at"] else None
+        return summary
+
+    def health(self) -> dict:
+        with self._lock:
+            statuses = [job["status"] for job in self.jobs.values()]
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": self.queue.qsize(),
+            **{status: statuses.count(status) for status in ("running", "done", "failed")},
+        }
+
+    def route(self, method: str, path: str, body: bytes):
+        parts = [part for part in path.split("?", 1)[0].split("/") if part]
+        if parts == ["health"]:
+            return 200, self.health()
+        if parts == ["jobs"]:
+            if method == "POST":
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    return 400, {"error": "Body must be JSON"}
+                return self.submit(payload if isinstance(payload, dict) else {})
+            if method == "GET":
+                with self._lock:
+                    jobs = list(self.jobs.values())
+                return 200, {"jobs": [self.describe(job) for job in jobs]}
+            return 405, {"error": f"{method} not allowed"}
+        if len(parts) < 2 or parts[0] != "jobs":
+            return 404, {"error": f"Unknown path {path}"}
+        job = self.jobs.get(parts[1])
+        if job is None:
+            return 404, {"error": f"Unknown job {parts[1]}"}
+        if method != "GET":
+            return 405, {"error": f"{method} not allowed"}
+        if len(parts) == 2:
+            return 200, self.describe(job)
+        if parts[2:] == ["report"]:
+            if not os.path.exists(job["report"]):
+                return 404, {"error": "Report is not ready yet"}
+            with open(job["report"], encoding="utf-8") as f:
+                return 200, f.read()
+        if parts[2:] == ["artifacts"]:
+            return 200, dict(job["artifacts"])
+        if len(parts) == 4 and parts[2] == "artifacts" and parts[3] in job["artifacts"]:
+            return 200, job["artifacts"][parts[3]]
+        return 404, {"error": f"Unknown path {path}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if len(request_line) < 2:
+                return
+            method, path = request_line[0].upper(), request_line[1]
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1")
+                if line in ("\r\n", "\n", ""):
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                status, payload = 400, {"error": "Invalid Content-Length header"}
+            elif length > MAX_BODY_BYTES:
+                status, payload = 413, {"error": "Request body too large"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, payload = self.route(method, path, body)
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+            await self.respond(writer, status, payload)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, payload) -> None:
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/markdown; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+        headers = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                   f"Content-Length: {len(body)}", "Connection: close"]
+        if status == 429:
+            headers.append(f"Retry-After: {payload['retry_after']}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(args) -> None:
+    service = AnalystService(args.workers, args.queue_size, args.output_dir, args.task_workers)
+    server = await service.start(args.host, args.port)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"Сервис принимает задачи на http://{host}:{port}/jobs "
+          f"(одновременно {args.workers}, очередь {args.queue_size})")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP-сервис генерации документации с общим пулом агентов")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="одновременно выполняемых задач")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="задач в очереди, сверх этого сервис отвечает 429")
+    parser.add_argument("--task-workers", type=int, default=1, help="параллельных шагов внутри одной задачи")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--mock", action="store_true", help="работать с локальными заглушками LLM и поиска")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    if args.mock:
+        import mock_servers
+
+        llm_server = mock_servers.start_server(mock_servers.LLMHandler)
+        search_server = mock_servers.start_server(mock_servers.SearchHandler)
+        mock_servers.offline_environment(mock_servers.server_url(llm_server, "/v1"),
+                                         mock_servers.server_url(search_server))
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
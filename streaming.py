@@ -0,0 +1,176 @@
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from common import env_flag, write_atomic
+from instrumentation import tracer
+
+SECTION_TITLES = {
+    "collect_requirements_dialogue": "Диалог и сбор требований",
+    "gather_business_text": "Бизнес-контекст",
+    "extract_requirements": "BRD",
+    "generate_use_cases_and_user_stories": "Use Cases и User Stories",
+    "create_process_diagrams": "Диаграммы процессов",
+    "validate_requirements_quality": "Отчет о валидации",
+    "publish_to_confluence": "Документация для Confluence",
+}
+SECTION_HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$", re.M)
+FINAL_ANSWER = "Final Answer:"
+DRAFT_NOTICE = "> Черновик: разделы добавляются по мере готовности, итоговый документ заменит этот файл."
+
+
+def streaming_enabled() -> bool:
+    return env_flag("LLM_STREAM")
+
+
+def pipelining_enabled() -> bool:
+    return streaming_enabled() and env_flag("PIPELINED_SECTIONS", default=True)
+
+
+_announced = set()
+_console_lock = threading.Lock()
+_console_registered = False
+
+
+def _announce_task(source, event) -> None:
+    span = tracer.current("task")
+    if span is None:
+        return
+    with _console_lock:
+        if span["id"] in _announced:
+            return
+        _announced.add(span["id"])
+    print(f"\n\n>>> {SECTION_TITLES.get(span['name'], span['name'])}\n", flush=True)
+
+
+def stream_to_console() -> None:
+    global _console_registered
+    from crewai.utilities.events import crewai_event_bus, LLMCallStartedEvent
+
+    with _console_lock:
+        if _console_registered:
+            return
+        _console_registered = True
+    crewai_event_bus.register_handler(LLMCallStartedEvent, _announce_task)
+
+
+def emit_cached_response(llm, response: str) -> None:
+    from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+
+    if _console_registered:
+        _announce_task(llm, None)
+    crewai_event_bus.emit(llm, event=LLMStreamChunkEvent(chunk=response))
+
+
+def section_title(heading: str) -> str:
+    title = re.sub(r"[*_`]", "", heading).replace("-", " ").casefold()
+    return re.sub(r"^[\d.)\s]+", "", title).strip()
+
+
+def section_matches(heading: str, name: str) -> bool:
+    pattern = rf"(?<!non )\b{re.escape(section_title(name))}s?\b"
+    return re.search(pattern, section_title(heading)) is not None
+
+
+def heading_sections(text: str, complete: bool = True) -> List[Tuple[str, str]]:
+    headings = list(SECTION_HEADING.finditer(text))
+    sections = []
+    for index, match in enumerate(headings):
+        level = len(match.group(1))
+        end = next((other.start() for other in headings[index + 1:] if len(other.group(1)) <= level), None)
+        if end is None and not complete:
+            continue
+        sections.append((match.group(2), text[match.start():end].strip()))
+    return sections
+
+
+def select_sections(text: str, names: List[str], complete: bool = True) -> Optional[str]:
+    sections = heading_sections(text, complete)
+    selected = []
+    for name in names:
+        body = next((body for heading, body in sections if section_matches(heading, name)), None)
+        if body is None:
+            return None
+        if body not in selected:
+            selected.append(body)
+    return "\n\n".join(selected)
+
+
+class SectionStream:
+    def __init__(self, on_update: Callable[[], None]):
+        self.on_update = on_update
+        self.text = ""
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        if "#" in chunk:
+            self.on_update()
+
+    def final_answer(self) -> str:
+        index = self.text.rfind(FINAL_ANSWER)
+        return self.text[index + len(FINAL_ANSWER):].lstrip() if index >= 0 else ""
+
+
+_section_streams: Dict[int, SectionStream] = {}
+_sections_registered = False
+
+
+def _feed_section_stream(source, event) -> None:
+    span = tracer.current("task")
+    stream = _section_streams.get(span["id"]) if span else None
+    if stream is not None and event.chunk:
+        stream.feed(event.chunk)
+
+
+def watch_sections() -> None:
+    global _sections_registered
+    from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+
+    with _console_lock:
+        if _sections_registered:
+            return
+        _sections_registered = True
+    crewai_event_bus.register_handler(LLMStreamChunkEvent, _feed_section_stream)
+
+
+def open_section_stream(span_id: int, on_update: Callable[[], None]) -> SectionStream:
+    stream = _section_streams[span_id] = SectionStream(on_update)
+    return stream
+
+
+def close_section_stream(span_id: int) -> None:
+    _section_streams.pop(span_id, None)
+
+
+def is_draft(path: str) -> bool:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return DRAFT_NOTICE in f.read(4096)
+
+
+class ReportWriter:
+    def __init__(self, path: str, final_task: str, title: str = ""):
+        self.path = path
+        self.final_task = final_task
+        self.title = title
+        self.sections: List[str] = []
+        self._lock = threading.Lock()
+
+    def section(self, name: str, raw: str) -> None:
+        with self._lock:
+            if name == self.final_task:
+                write_atomic(self.path, raw)
+                return
+            heading = SECTION_TITLES.get(name, name)
+            if not self.sections:
+                header = f"# {self.title}\n\n{DRAFT_NOTICE}\n\n" if self.title else f"{DRAFT_NOTICE}\n\n"
+                write_atomic(self.path, header)
+            self.sections.append(name)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(f"## {heading}\n\n{raw.strip()}\n\n")
+                f.flush()
+
+    def on_complete(self, name: str, output) -> None:
+        self.section(name, output.raw)
+
+    def task_callback(self, output) -> None:
+        self.section(output.name or "", output.raw)
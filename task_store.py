@@ -0,0 +1,66 @@
+from typing import List, Optional
+
+from cache import DiskCache, cache_from_env, content_key
+from common import env_flag, write_atomic
+
+TASK_STORE_DIR = ".task_store"
+
+
+def agent_definition(agent) -> dict:
+    llm = getattr(agent, "llm", None)
+    return {
+        "role": agent.role,
+        "goal": agent.goal,
+        "backstory": agent.backstory,
+        "model": getattr(llm, "model", llm),
+        "max_tokens": getattr(llm, "max_tokens", None),
+        "tools": sorted(getattr(tool, "name", type(tool).__name__) for tool in agent.tools or []),
+    }
+
+
+def task_key(task, upstream_outputs: List[str], attachments: List[str] = ()) -> str:
+    parts = [
+        task.description,
+        task.expected_output,
+        getattr(task, "brief", ""),
+        agent_definition(task.agent),
+        [content_key(output) for output in upstream_outputs],
+    ]
+    if attachments:
+        parts.append(sorted(attachments))
+    return content_key(*parts)
+
+
+def make_output(task, raw: str):
+    from crewai.tasks.task_output import TaskOutput
+
+    output = TaskOutput(description=task.description, raw=raw, agent=task.agent.role)
+    task.output = output
+    return output
+
+
+def save_output_file(task, raw: str) -> None:
+    path = getattr(task, "output_file", None)
+    if path:
+        write_atomic(path, raw)
+
+
+class TaskStore:
+    def __init__(self, cache: DiskCache):
+        self.cache = cache
+
+    def load(self, task, key: str):
+        raw = self.cache.get(key)
+        if raw is None:
+            return None
+        save_output_file(task, raw)
+        return make_output(task, raw)
+
+    def save(self, key: str, output) -> None:
+        self.cache.set(key, output.raw)
+
+
+def default_task_store() -> Optional[TaskStore]:
+    if env_flag("TASK_STORE_DISABLED"):
+        return None
+    return TaskStore(cache_from_env("TASK_STORE", TASK_STORE_DIR))
@@ -1,6 +1,14 @@
 from crewai import Task, Crew
+from scheduler import TaskScheduler, DEFAULT_MAX_WORKERS, task_name, task_dependencies, task_context
+from task_store import default_task_store, make_output
+from artifacts import publish_artifacts, publish_with_llm
+from pipeline_cache import default_pipeline_cache, adapt_artifacts, pipeline_definition
+from streaming import ReportWriter, pipelining_enabled
+from prompts import project_brief, append_brief
+from routing import default_router
+from documents import attachment_digests
 from agents import (
-    chatbot_analyst,
+    create_chatbot_analyst,
     create_business_researcher,
     create_requirement_analyst,
     create_diagram_architect,
@@ -8,20 +16,39 @@ from agents import (
     create_confluence_publisher
 )
 
-def create_tasks(topic: str, user_input: str):
+class PipelineTask(Task):
+    brief: str = ""
+    route: dict = {}
+    sections: dict = {}
+
+def make_topic(user_input: str) -> str:
+    return user_input[:50] if len(user_input) > 50 else user_input
+
+def create_tasks(topic: str, user_input: str, output_file: str = "report.txt"):
     
-    business_researcher = create_business_researcher(topic)
-    requirement_analyst = create_requirement_analyst(topic)
-    diagram_architect = create_diagram_architect(topic)
-    requirements_validator = create_requirements_validator(topic)
-    confluence_publisher = create_confluence_publisher(topic)
+    router = default_router()
+    routes = {name: router.select(name) for name in (
+        "collect_requirements_dialogue", "gather_business_text", "extract_requirements",
+        "generate_use_cases_and_user_stories", "create_process_diagrams", "validate_requirements_quality",
+        "publish_to_confluence")}
+    chatbot_analyst = create_chatbot_analyst(**routes["collect_requirements_dialogue"])
+    business_researcher = create_business_researcher(**routes["gather_business_text"])
+    requirement_analyst = create_requirement_analyst(**routes["extract_requirements"])
+    story_analyst = create_requirement_analyst(**routes["generate_use_cases_and_user_stories"])
+    diagram_architect = create_diagram_architect(**routes["create_process_diagrams"])
+    requirements_validator = create_requirements_validator(**routes["validate_requirements_quality"])
+    confluence_publisher = create_confluence_publisher(**routes["publish_to_confluence"])
+    brief = project_brief(topic)
     
-    collect_requirements_dialogue = Task(
-        description=f"""Based on the user's initial input: "{user_input}", conduct a comprehensive analysis to understand their business need.
+    collect_requirements_dialogue = PipelineTask(
+        name="collect_requirements_dialogue",
+        brief=project_brief(topic, user_input),
+        route=routes["collect_requirements_dialogue"],
+        description="""Based on the user's initial input given in the project brief, conduct a comprehensive analysis to understand their business need.
         
         Since this is an automated system, you should analyze the business need and create a structured summary as if you conducted a dialogue.
         Gather complete information about:
-        - The specific business problem or need (analyze from: {user_input})
+        - The specific business problem or need (analyze from the user's input in the project brief)
         - Current process (AS-IS) - how things work now (infer from banking best practices)
         - Desired outcome (TO-BE) - what they want to achieve
         - Key stakeholders involved (typical for banking credit processing)
@@ -30,11 +57,11 @@ def create_tasks(topic: str, user_input: str):
         - Success criteria and KPIs (typical metrics for credit automation)
         - Scope boundaries (what's in and out of scope)
         
-        IMPORTANT: Create a detailed, realistic dialogue summary and structured analysis based on the business need: {user_input}.
+        IMPORTANT: Create a detailed, realistic dialogue summary and structured analysis based on the business need in the project brief.
         Be thorough and include specific details relevant to credit application automation in banking.""",
         agent=chatbot_analyst,
         expected_output="""Complete dialogue transcript and structured summary including:
-        - Business problem statement (clear and specific based on: {user_input})
+        - Business problem statement (clear and specific, based on the project brief)
         - Current AS-IS process description (detailed manual process)
         - Desired TO-BE state (automated process)
         - Identified stakeholders with their roles (Customer, Credit Analyst, Risk Manager, Compliance Officer, etc.)
@@ -46,8 +73,11 @@ def create_tasks(topic: str, user_input: str):
         - Initial glossary of business terms"""
     )
     
-    gather_business_text = Task(
-        description=f"""Based on the dialogue transcript from the previous task, conduct a deep investigation of the business problem: {topic}.
+    gather_business_text = PipelineTask(
+        name="gather_business_text",
+        brief=brief,
+        route=routes["gather_business_text"],
+        description="""Based on the dialogue transcript from the previous task, conduct a deep investigation of the business problem in the project brief.
         
         Use the information collected in the dialogue to analyze and expand on:
         - Detailed stakeholder analysis (roles, responsibilities, interests)
@@ -72,9 +102,12 @@ def create_tasks(topic: str, user_input: str):
         - Related systems and integration points
         - Complete glossary of terms"""
     )
-    extract_requirements = Task(
-        description=f"""Convert the researched business context and dialogue information into a formal,
-comprehensive Business Requirements Document (BRD) for: {topic}.
+    extract_requirements = PipelineTask(
+        name="extract_requirements",
+        brief=brief,
+        route=routes["extract_requirements"],
+        description="""Convert the researched business context and dialogue information into a formal,
+comprehensive Business Requirements Document (BRD) for the project in the brief.
         
         IMPORTANT: Use ALL context from previous tasks - the dialogue transcript and business context research.
         
@@ -110,8 +143,11 @@ comprehensive Business Requirements Document (BRD) for: {topic}.
         - Assumptions and Dependencies
         - Risk Register"""
     )
-    generate_use_cases_and_user_stories = Task(
-        description=f"""Based on the BRD and requirements for {topic}, generate comprehensive
+    generate_use_cases_and_user_stories = PipelineTask(
+        name="generate_use_cases_and_user_stories",
+        brief=brief,
+        route=routes["generate_use_cases_and_user_stories"],
+        description="""Based on the BRD and requirements for the project, generate comprehensive
 Use Case specifications and structured User Stories.
         
         IMPORTANT: Use the BRD from the previous task. For EACH functional requirement in the BRD:
@@ -136,8 +172,9 @@ Use Case specifications and structured User Stories.
         Generate at least 5-8 detailed Use Cases and 8-12 User Stories.
         Ensure complete traceability: every functional requirement must be traced to at least one Use Case.
         All User Stories must be independent, negotiable, valuable, estimable, small, and testable.""",
-        agent=requirement_analyst,
+        agent=story_analyst,
         context=[extract_requirements],
+        sections={"extract_requirements": ["Functional Requirements"]},
         expected_output="""Complete Use Cases and User Stories documentation with FULL CONTENT:
         - Use Case List (with IDs and names) - minimum 5 use cases
         - Full Use Case Descriptions for each use case (detailed, not just summaries):
@@ -157,8 +194,11 @@ Use Case specifications and structured User Stories.
           * Definition of Done
         - Requirements Traceability Matrix (requirement -> use case -> user story)"""
     )
-    create_process_diagrams = Task(
-        description=f"""Using the collected requirements, BRD, Use Cases, and business context for {topic},
+    create_process_diagrams = PipelineTask(
+        name="create_process_diagrams",
+        brief=brief,
+        route=routes["create_process_diagrams"],
+        description="""Using the collected requirements, BRD, Use Cases, and business context of the project,
 design comprehensive AS-IS and TO-BE BPMN 2.0 diagrams, activity diagrams, use-case diagrams,
 and sequence diagrams.
         
@@ -176,11 +216,13 @@ and sequence diagrams.
         - Eliminate ambiguities
         - Include all decision points and alternative flows
         - Show clear improvement from AS-IS to TO-BE
-        - Are specific to the business problem: {topic}
+        - Are specific to the business problem in the project brief
         
         Output diagrams in Mermaid syntax for easy rendering. Include ALL diagrams, not just summaries.""",
         agent=diagram_architect,
         context=[extract_requirements, generate_use_cases_and_user_stories],
+        sections={"extract_requirements": ["Functional Requirements"],
+                  "generate_use_cases_and_user_stories": ["Use Case"]},
         expected_output="""Complete set of process diagrams with FULL Mermaid code:
         - AS-IS BPMN Process Diagram (detailed, showing current state with pain points)
         - TO-BE BPMN Process Diagram (detailed, showing improved process with automation)
@@ -189,28 +231,32 @@ and sequence diagrams.
         - Sequence Diagrams (for at least 2-3 critical use cases showing actor-system interactions)
         All diagrams in Mermaid syntax, properly formatted and documented"""
     )
-    validate_requirements_quality = Task(
-        description=f"""Perform a comprehensive quality review of all produced business artifacts for {topic}.
+    validate_requirements_quality = PipelineTask(
+        name="validate_requirements_quality",
+        brief=brief,
+        route=routes["validate_requirements_quality"],
+        description="""Perform a comprehensive quality review of all produced business artifacts for the project.
         
         IMPORTANT: Review ALL previous artifacts - BRD, Use Cases, User Stories, and Diagrams.
         
+        The context starts with an Automated Validation Report: ID resolution in the traceability matrix,
+        Given/When/Then scenarios in user stories and Mermaid syntax have already been checked locally.
+        Do not repeat these checks - carry their findings into your report as-is.
+        
         Evaluate:
         - Clarity: Are all requirements clear and unambiguous?
         - Consistency: Are there contradictions between documents?
         - Completeness: Are all necessary requirements captured?
-        - Traceability: Can each requirement be traced from business objective to implementation?
-        - Testability: Can each requirement be tested/verified?
         - Alignment: Do requirements align with business goals?
         - Banking Sector Compliance: Do requirements meet regulatory standards?
         
         Check specifically for:
-        - Missing acceptance criteria (all must be quantifiable)
+        - Acceptance criteria that are not quantifiable
         - Unclear definitions of key terms
         - Missing edge cases and exception handling
-        - Incomplete BPMN diagrams (missing decision points, alternative flows)
+        - BPMN diagrams that miss decision points or alternative flows of the process
         - Weak user stories (not INVEST compliant)
         - Missing non-functional requirements
-        - Incomplete traceability matrix
         
         Provide actionable recommendations for improvement with specific examples.""",
         agent=requirements_validator,
@@ -220,15 +266,18 @@ and sequence diagrams.
         - Issues Found (categorized by severity: Critical, High, Medium, Low) - with specific examples
         - Contradictions or Missing Details (with specific examples from documents)
         - Unclear Definitions (list of terms needing clarification)
-        - Missing Acceptance Criteria (for each affected requirement)
+        - Automated Check Findings (from the Automated Validation Report)
+        - Weak Acceptance Criteria (for each affected requirement)
         - Incomplete Diagrams (specific gaps identified)
-        - Traceability Gaps (missing links in traceability matrix)
         - Recommended Fixes (actionable, prioritized)
         - Compliance Assessment (banking sector standards)
         - Overall Quality Score and Readiness Assessment"""
     )
-    publish_to_confluence = Task(
-        description=f"""Publish the complete business analysis documentation for {topic} to Confluence.
+    publish_to_confluence = PipelineTask(
+        name="publish_to_confluence",
+        brief=brief,
+        route=routes["publish_to_confluence"],
+        description="""Publish the complete business analysis documentation for the project to Confluence.
         
         CRITICAL: You MUST compile ALL content from previous tasks:
         - Dialogue summary from chatbot
@@ -264,9 +313,19 @@ and sequence diagrams.
         - Diagrams Page (all BPMN, activity, use case, and sequence diagrams with Mermaid code)
         - Validation Report Page (complete quality assessment)
         All pages properly formatted, linked, and ready for Confluence import with actual content included""",
-        output_file="report.txt"
+        output_file=output_file
     )
     
+    agents = [
+        chatbot_analyst,
+        business_researcher,
+        requirement_analyst,
+        story_analyst,
+        diagram_architect,
+        requirements_validator,
+        confluence_publisher
+    ]
+    
     return [
         collect_requirements_dialogue,
         gather_business_text,
@@ -275,22 +334,84 @@ and sequence diagrams.
         create_process_diagrams,
         validate_requirements_quality,
         publish_to_confluence
-    ], [
-        chatbot_analyst,
-        business_researcher,
-        requirement_analyst,
-        diagram_architect,
-        requirements_validator,
-        confluence_publisher
-    ]
+    ], agents
+
+class BudgetedCrew(Crew):
+    def _get_context(self, task, task_outputs):
+        deps = task_dependencies(task)
+        if deps and all(dep.output is not None for dep in deps):
+            return task_context(task, [(task_name(dep), dep.output.raw) for dep in deps])
+        return append_brief(super()._get_context(task, task_outputs), task)
 
 def create_crew(topic: str, user_input: str):
     tasks, agents = create_tasks(topic, user_input)
+    writer = ReportWriter(tasks[-1].output_file, tasks[-1].name, topic)
     
-    crew = Crew(
+    crew = BudgetedCrew(
         agents=agents,
         tasks=tasks,
+        task_callback=writer.task_callback,
         verbose=True
     )
     
     return crew
+
+def replay_pipeline(hit: dict, topic: str, output_file: str = "report.txt", on_complete=None):
+    from crewai.tasks.task_output import TaskOutput
+
+    artifacts = adapt_artifacts(hit["artifacts"], hit["topic"], topic)
+    writer = ReportWriter(output_file, hit["final_task"], topic) if output_file else None
+    outputs = {}
+    for name, raw in artifacts.items():
+        outputs[name] = TaskOutput(name=name, description=name, raw=raw, agent="pipeline cache")
+        if writer:
+            writer.section(name, raw)
+        if on_complete:
+            on_complete(name, outputs[name])
+    print(f"Результат взят из кэша конвейера: задача «{hit['topic']}»")
+    return outputs[hit["final_task"]]
+
+def run_pipeline(topic: str, user_input: str, max_workers: int = DEFAULT_MAX_WORKERS,
+                 store=default_task_store, output_file: str = "report.txt", on_complete=None,
+                 pipeline_cache=default_pipeline_cache, bypass_cache: bool = False):
+    if callable(pipeline_cache):
+        pipeline_cache = pipeline_cache()
+    attachments = attachment_digests()
+    tasks, _ = create_tasks(topic, user_input, output_file=None)
+    router = default_router()
+    definition = pipeline_definition(tasks, router.config)
+    if pipeline_cache and not bypass_cache:
+        hit = pipeline_cache.lookup(user_input, attachments, definition)
+        if hit:
+            return replay_pipeline(hit, topic, output_file, on_complete)
+    final = tasks[-1]
+    if not publish_with_llm():
+        tasks = tasks[:-1]
+    writer = ReportWriter(output_file, final.name, topic) if output_file else None
+    if callable(store):
+        store = store()
+
+    def task_done(name, output):
+        if writer:
+            writer.on_complete(name, output)
+        if on_complete:
+            on_complete(name, output)
+
+    scheduler = TaskScheduler(tasks, max_workers=max_workers, store=store, on_complete=task_done,
+                              pipelined=pipelining_enabled(), attachments=attachments)
+    try:
+        outputs = scheduler.run()
+    except Exception:
+        router.record_failure(tasks, scheduler.failed)
+        raise
+    print(scheduler.report())
+    router.record_pipeline(tasks, scheduler.timings, outputs)
+    rendered = publish_artifacts(topic, user_input, {name: output.raw for name, output in outputs.items()
+                                                     if name != final.name})
+    if final.name not in outputs:
+        outputs[final.name] = make_output(final, rendered)
+        task_done(final.name, outputs[final.name])
+    if pipeline_cache:
+        pipeline_cache.save(user_input, topic, final.name,
+                            {name: output.raw for name, output in outputs.items()}, attachments, definition)
+    return outputs[final.name]
@@ -0,0 +1,81 @@
+import pytest
+
+from artifacts import ArtifactStore, index_page, project_id, publish_artifacts
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Автоматизировать проверку KYC", "Не автоматизировать проверку KYC"),
+    ("Лимит перевода 1 млн рублей", "Лимит перевода 5 млн рублей"),
+    ("Уведомления по SMS", "Уведомления по push"),
+])
+def test_distinct_problems_get_distinct_projects(first, second):
+    assert project_id(first) != project_id(second)
+
+
+def test_project_ignores_whitespace_and_honours_explicit_id(monkeypatch):
+    monkeypatch.delenv("ARTIFACTS_PROJECT", raising=False)
+    assert project_id("Улучшить  процесс KYC\n") == project_id("Улучшить процесс KYC")
+    monkeypatch.setenv("ARTIFACTS_PROJECT", "kyc")
+    assert project_id("Улучшить процесс KYC") == "kyc"
+
+
+def test_similar_problems_do_not_overwrite_each_other(tmp_path, monkeypatch):
+    monkeypatch.delenv("ARTIFACTS_PROJECT", raising=False)
+    monkeypatch.delenv("CONFLUENCE_URL", raising=False)
+    store = ArtifactStore(str(tmp_path))
+    first, second = "Лимит перевода 1 млн рублей", "Лимит перевода 5 млн рублей"
+    publish_artifacts("Лимиты", first, {"extract_requirements": "# BRD\nFR-001 1 млн"}, store)
+    publish_artifacts("Лимиты", second, {"extract_requirements": "# BRD\nFR-001 5 млн"}, store)
+    assert "1 млн" in store.page(project_id(first), "brd")
+    assert "5 млн" in store.page(project_id(second), "brd")
+
+
+def test_index_counts_only_upstream_artifacts():
+    artifacts = {"extract_requirements": "- **FR-001:** Accept scans.\n",
+                 "validate_requirements_quality": "- **FR-002:** Unknown.\n## Traceability\n| FR-009 |\n"}
+    page = index_page("KYC", artifacts)
+    assert "Идентификаторов требований: 1 (в матрице трассируемости: 0)" in page
+    assert "critical 0, high 0," in page
+
+
+@pytest.fixture
+def confluence():
+    from artifacts import ConfluenceClient
+    from mock_servers import ConfluenceHandler, server_url, start_server
+
+    ConfluenceHandler.latency = 0
+    ConfluenceHandler.reset_stats()
+    server = start_server(ConfluenceHandler)
+    yield ConfluenceClient(server_url(server), "BA")
+    server.shutdown()
+    ConfluenceHandler.reset_stats()
+
+
+def test_projects_with_the_same_topic_keep_their_own_confluence_pages(tmp_path, monkeypatch, confluence):
+    from mock_servers import ConfluenceHandler
+
+    monkeypatch.delenv("ARTIFACTS_PROJECT", raising=False)
+    store = ArtifactStore(str(tmp_path))
+    first, second = "Лимит перевода 1 млн рублей", "Лимит перевода 5 млн рублей"
+    publish_artifacts("Лимиты", first, {"extract_requirements": "# BRD\nFR-001 1 млн"}, store, confluence)
+    publish_artifacts("Лимиты", second, {"extract_requirements": "# BRD\nFR-001 5 млн"}, store, confluence)
+    manifests = [store.manifest(project_id(problem))["pages"] for problem in (first, second)]
+    assert ConfluenceHandler.stats == {"created": 12, "updated": 0}
+    assert {entry["page_id"] for entry in manifests[0].values()}.isdisjoint(
+        entry["page_id"] for entry in manifests[1].values())
+    pages = ConfluenceHandler.pages
+    assert "1 млн" in pages[manifests[0]["brd"]["page_id"]]["body"]["storage"]["value"]
+    assert "5 млн" in pages[manifests[1]["brd"]["page_id"]]["body"]["storage"]["value"]
+    assert project_id(second) in manifests[1]["brd"]["title"]
+
+
+def test_lost_page_ids_are_recovered_by_the_project_title(tmp_path, monkeypatch, confluence):
+    from mock_servers import ConfluenceHandler
+
+    monkeypatch.delenv("ARTIFACTS_PROJECT", raising=False)
+    problem = "Лимит перевода 1 млн рублей"
+    publish_artifacts("Лимиты", problem, {"extract_requirements": "# BRD\nFR-001 1 млн"},
+                      ArtifactStore(str(tmp_path / "a")), confluence)
+    publish_artifacts("Лимиты", problem, {"extract_requirements": "# BRD\nFR-001 2 млн"},
+                      ArtifactStore(str(tmp_path / "b")), confluence)
+    assert ConfluenceHandler.stats == {"created": 6, "updated": 6}
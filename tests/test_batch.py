@@ -0,0 +1,71 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import batch
+from batch import output_path, read_problems, run_batch
+from streaming import DRAFT_NOTICE
+
+
+@pytest.fixture
+def problems(tmp_path):
+    path = tmp_path / "problems.jsonl"
+    records = [{"id": "done", "problem": "Готовый отчет"}, {"id": "draft", "problem": "Черновик"},
+               {"id": "slow", "problem": "Медленная задача"}, {"id": "fast", "problem": "Быстрая задача"},
+               {"id": "bad", "problem": "Ошибка"}]
+    path.write_text("\n".join(json.dumps(record, ensure_ascii=False) for record in records) + "\n",
+                    encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    calls = []
+
+    def fake_run(job, output_dir, task_workers):
+        calls.append(job["id"])
+        results = output_dir + "/results.jsonl"
+        if job["id"] == "slow":
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and '"fast"' not in open(results, encoding="utf-8").read():
+                time.sleep(0.01)
+        status = "failed" if job["id"] == "bad" else "ok"
+        return {"id": job["id"], "status": status, "error": None, "output": output_path(output_dir, job["id"]),
+                "seconds": 0.0}
+
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(batch, "share_rate_limits", lambda workers: None)
+    monkeypatch.setattr(batch, "run_problem", fake_run)
+    return calls
+
+
+def test_problems_are_read_with_fallbacks(tmp_path, capsys):
+    path = tmp_path / "problems.jsonl"
+    path.write_text('{"id": 7, "problem": " KYC "}\n\n{"user_input": "AML"}\n{"problem": ""}\n', encoding="utf-8")
+    assert list(read_problems(str(path))) == [{"id": "7", "problem": "KYC"}, {"id": "3", "problem": "AML"}]
+    assert "Строка 4" in capsys.readouterr().out
+    assert output_path("reports", "a/b c").endswith("a_b_c.md")
+
+
+def test_existing_reports_are_skipped_but_drafts_rerun(problems, pipeline, tmp_path):
+    output_dir = tmp_path / "reports"
+    output_dir.mkdir()
+    (output_dir / "done.md").write_text("# Отчет", encoding="utf-8")
+    (output_dir / "draft.md").write_text(f"# Отчет\n\n{DRAFT_NOTICE}\n", encoding="utf-8")
+    summary = run_batch(str(problems), str(output_dir), workers=2, skip_existing=True)
+    assert sorted(pipeline) == ["bad", "draft", "fast", "slow"]
+    assert (summary["ok"], summary["failed"], summary["skipped"]) == (3, 1, 1)
+
+
+def test_results_are_written_as_each_job_finishes(problems, pipeline, tmp_path):
+    output_dir = tmp_path / "reports"
+    started = time.monotonic()
+    run_batch(str(problems), str(output_dir), workers=2)
+    assert time.monotonic() - started < 4
+    with open(output_dir / "results.jsonl", encoding="utf-8") as f:
+        results = [json.loads(line) for line in f]
+    order = [result["id"] for result in results]
+    assert sorted(order) == ["bad", "done", "draft", "fast", "slow"]
+    assert order.index("fast") < order.index("slow")
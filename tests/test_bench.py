@@ -0,0 +1,21 @@
+from bench import compare_with_baseline
+
+
+def run(**metrics):
+    return {"import_seconds": 1.0, "runs": {"short/c1": dict(metrics)}, "config": {"stream": False}}
+
+
+def test_lower_is_better_metrics_regress_upwards():
+    regressions = compare_with_baseline(run(wall_seconds=13.0), run(wall_seconds=10.0), 0.2)
+    assert regressions == ["runs.short/c1.wall_seconds: 10 -> 13 (+30%)"]
+    assert compare_with_baseline(run(wall_seconds=5.0), run(wall_seconds=10.0), 0.2) == []
+
+
+def test_higher_is_better_metrics_regress_downwards():
+    baseline = run(runs_per_minute=10.0, cached_tokens=4096, prefix_tokens=2048)
+    assert compare_with_baseline(run(runs_per_minute=20.0, cached_tokens=8192, prefix_tokens=4096),
+                                 baseline, 0.2) == []
+    regressions = compare_with_baseline(run(runs_per_minute=7.0, cached_tokens=4096, prefix_tokens=0),
+                                        baseline, 0.2)
+    assert regressions == ["runs.short/c1.runs_per_minute: 10 -> 7 (-30%)",
+                           "runs.short/c1.prefix_tokens: 2048 -> 0 (-100%)"]
@@ -0,0 +1,83 @@
+import json
+import os
+import time
+
+from cache import DiskCache, content_key
+
+
+def age(cache, key, seconds):
+    path = cache._path(key)
+    stamp = time.time() - seconds
+    with open(path, encoding="utf-8") as f:
+        entry = json.load(f)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(entry, created=stamp), f)
+    os.utime(path, (stamp, stamp))
+
+
+def test_content_key_depends_on_every_part():
+    assert content_key("model", [{"role": "user", "content": "a"}]) == \
+        content_key("model", [{"role": "user", "content": "a"}])
+    assert content_key("model", "a", None) != content_key("model", "a", 100)
+    assert content_key("a", "b") != content_key("b", "a")
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    assert cache.get("missing") is None
+    cache.set("key", {"text": "значение"})
+    assert cache.get("key") == {"text": "значение"}
+    assert cache.stats() == {"hits": 1, "misses": 1, "writes": 1, "evictions": 0, "hit_rate": 0.5}
+
+
+def test_expired_entries_miss_and_are_evicted(tmp_path):
+    cache = DiskCache(str(tmp_path), max_age=60)
+    cache.set("old", "x")
+    cache.set("new", "y")
+    age(cache, "old", 120)
+    assert cache.get("old") is None
+    assert cache.evict() == 1
+    assert not os.path.exists(cache._path("old"))
+    assert cache.get("new") == "y"
+
+
+def test_hits_do_not_extend_max_age(tmp_path):
+    cache = DiskCache(str(tmp_path), max_age=60)
+    cache.set("key", "value")
+    age(cache, "key", 50)
+    created = os.path.getmtime(cache._path("key"))
+    assert cache.get("key") == "value"
+    assert os.path.getmtime(cache._path("key")) == created
+    age(cache, "key", 70)
+    assert cache.get("key") is None
+
+
+def test_overwrites_are_not_counted_twice(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=3000)
+    cache.set("first", "x" * 1000)
+    for _ in range(5):
+        cache.set("key", "y" * 1000)
+    assert cache.evictions == 0
+    assert cache.get("first") is not None
+
+
+def test_size_budget_evicts_least_recently_used(tmp_path):
+    value = "x" * 1000
+    cache = DiskCache(str(tmp_path), max_bytes=3500, max_age=0)
+    for index, key in enumerate(("a", "b", "c")):
+        cache.set(key, value)
+        age(cache, key, 30 - index * 10)
+    assert cache.get("a") == value
+    cache.set("d", value)
+    assert cache.evictions == 1
+    assert cache.get("b") is None
+    assert [cache.get(key) == value for key in ("a", "c", "d")] == [True, True, True]
+
+
+def test_read_only_cache_never_writes_or_evicts(tmp_path):
+    DiskCache(str(tmp_path)).set("key", "value")
+    cache = DiskCache(str(tmp_path), max_bytes=1, read_only=True)
+    cache.set("other", "value")
+    assert cache.get("key") == "value"
+    assert cache.get("other") is None
+    assert cache.evict() == 0
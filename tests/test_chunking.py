@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from chunking import (MAP_PROMPT, PARTIAL_DIVIDER, REDUCE_PROMPT, _group_partials, bounded_map, count_tokens,
+                      iter_chunks, map_reduce)
+
+TEXT = " ".join(f"слово{index}" for index in range(600))
+
+
+def test_chunks_fit_the_budget_and_overlap():
+    chunks = list(iter_chunks(TEXT, chunk_size=100, overlap=20))
+    assert len(chunks) > 2
+    assert all(count_tokens(chunk) <= 100 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        previous, current = previous.split(), current.split()
+        shared = len(previous) - previous.index(current[0])
+        assert shared >= 1 and previous[-shared:] == current[:shared]
+        assert count_tokens(" ".join(current[:shared])) <= 20
+    words = []
+    for chunk in chunks:
+        words += [word for word in chunk.split() if word not in words]
+    assert words == TEXT.split()
+
+
+def test_overlap_must_be_smaller_than_chunk():
+    with pytest.raises(ValueError):
+        next(iter_chunks(TEXT, chunk_size=10, overlap=10))
+
+
+def test_chunks_are_produced_lazily():
+    chunks = iter_chunks(TEXT + " " + "x" * 10_000_000, chunk_size=50, overlap=0)
+    assert count_tokens(next(chunks)) <= 50
+
+
+def test_bounded_map_keeps_order_and_pulls_at_most_workers_ahead():
+    pulled, finished = [], []
+    lock = threading.Lock()
+    seen_ahead = []
+
+    def items():
+        for index in range(20):
+            pulled.append(index)
+            yield index
+
+    def square(item):
+        with lock:
+            seen_ahead.append(len(pulled) - len(finished))
+        with lock:
+            finished.append(item)
+        return item * item
+
+    assert bounded_map(square, items(), max_workers=3) == [i * i for i in range(20)]
+    assert max(seen_ahead) <= 3
+
+
+def test_partials_are_grouped_by_budget():
+    partials = ["a " * 40, "b " * 40, "c " * 40, "d " * 40, "e " * 40]
+    groups = _group_partials(partials, budget=count_tokens(partials[0]) * 2)
+    assert [item for group in groups for item in group] == partials
+    assert all(len(group) >= 2 for group in groups[:-1])
+    assert all(sum(count_tokens(item) for item in group) <= count_tokens(partials[0]) * 2 for group in groups)
+    oversized = _group_partials(["x " * 500, "y " * 500, "z " * 500], budget=10)
+    assert [len(group) for group in oversized] == [2, 1]
+
+
+def test_map_reduce_merges_partials_until_one_remains():
+    prompts = []
+    lock = threading.Lock()
+
+    def ask(prompt):
+        with lock:
+            prompts.append(prompt)
+        return "summary " * 30
+
+    result = map_reduce(ask, TEXT, chunk_size=100, overlap=10, max_workers=2)
+    maps = [prompt for prompt in prompts if prompt.startswith(MAP_PROMPT.split("{")[0])]
+    reduces = [prompt for prompt in prompts if prompt.startswith(REDUCE_PROMPT.split("{")[0])]
+    assert len(maps) == len(list(iter_chunks(TEXT, 100, 10)))
+    assert any(PARTIAL_DIVIDER in prompt for prompt in reduces)
+    assert result == "summary " * 30
+    assert map_reduce(ask, "") == ""
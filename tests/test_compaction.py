@@ -0,0 +1,43 @@
+from chunking import count_tokens
+from compaction import bm25_scores, compact, split_passages
+
+FILLER = "Общие сведения о банке, его истории, офисах и программах лояльности для клиентов. " * 6
+RELEVANT = "KYC проверка личности клиента требует паспорт, ИНН и подтверждение адреса."
+RESULT = "\n\n".join([FILLER + "Раздел 1.", RELEVANT, FILLER + "Раздел 2.",
+                      "Сроки KYC проверки составляют три рабочих дня.", FILLER + "Раздел 3."])
+
+
+def body(text):
+    return text.split("\n\n[Пропущено")[0]
+
+
+def test_results_within_budget_are_unchanged():
+    assert compact(RESULT, "KYC", budget=count_tokens(RESULT)) == RESULT
+
+
+def test_relevant_passages_are_kept_in_order_within_budget():
+    budget = count_tokens(RELEVANT) * 3
+    result = compact(RESULT, "KYC проверка", budget)
+    assert count_tokens(body(result)) <= budget
+    assert body(result).split("\n\n") == [RELEVANT, "Сроки KYC проверки составляют три рабочих дня."]
+    assert result.endswith("[Пропущено 3 менее релевантных фрагментов для экономии токенов...]")
+
+
+def test_unmatched_query_keeps_leading_passages_that_fit():
+    budget = count_tokens(FILLER) + 20
+    result = compact(RESULT, "ипотека", budget)
+    assert count_tokens(body(result)) <= budget
+    assert body(result).startswith(FILLER.strip())
+
+
+def test_passages_split_on_blank_lines_escaped_newlines_and_size():
+    assert split_passages("первый\n\nвторой\\n\\nтретий") == ["первый", "второй", "третий"]
+    long_block = " ".join(f"слово{i}" for i in range(400))
+    pieces = split_passages(long_block, max_tokens=50)
+    assert len(pieces) > 1 and all(count_tokens(piece) <= 50 for piece in pieces)
+
+
+def test_bm25_prefers_rarer_matching_terms():
+    scores = bm25_scores("паспорт банк", ["банк паспорт", "банк", "банк офис"])
+    assert scores[0] > scores[1] > 0
+    assert bm25_scores("", ["банк"]) == [0.0]
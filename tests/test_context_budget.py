@@ -0,0 +1,49 @@
+from chunking import count_tokens
+from context_budget import CONTEXT_DIVIDER, budgeted_context, context_budget, fit_context
+
+
+def section(title, topic, sentences=12):
+    body = " ".join(f"Предложение {i} раздела о {topic} с подробностями процесса." for i in range(sentences))
+    return f"## {title}\n{body}"
+
+
+BRD = "\n\n".join([section("Функциональные требования", "KYC проверке"),
+                   section("Глоссарий", "терминах банка"),
+                   section("История проекта", "прошлых релизах")])
+USE_CASES = "\n\n".join([section("Use Cases", "KYC проверке клиентов"),
+                         section("Функциональные требования", "KYC проверке")])
+
+
+def test_context_within_budget_is_unchanged():
+    upstream = [("extract_requirements", BRD), ("generate_use_cases_and_user_stories", USE_CASES)]
+    context, stats = fit_context("KYC", upstream, budget=100000)
+    assert context == BRD + CONTEXT_DIVIDER + USE_CASES
+    assert stats["tokens_after"] == stats["tokens_before"]
+
+
+def test_duplicates_go_first_then_least_relevant_sections_are_summarized():
+    upstream = [("extract_requirements", BRD), ("generate_use_cases_and_user_stories", USE_CASES)]
+    before = count_tokens(BRD + CONTEXT_DIVIDER + USE_CASES)
+    context, stats = fit_context("KYC проверка клиентов", upstream, budget=int(before * 0.6))
+    assert stats["deduplicated"] == 1
+    assert stats["summarized"] >= 1 and stats["dropped"] == 0
+    assert stats["tokens_after"] <= int(before * 0.6)
+    assert section("Use Cases", "KYC проверке клиентов") in context
+    assert "## История проекта\nПредложение 0 раздела о прошлых релизах с подробностями процесса. [...]" in context
+
+
+def test_sections_are_dropped_when_summaries_are_not_enough():
+    upstream = [("extract_requirements", BRD), ("generate_use_cases_and_user_stories", USE_CASES)]
+    context, stats = fit_context("KYC проверка клиентов", upstream, budget=50)
+    assert stats["dropped"] >= 1
+    assert count_tokens(context) <= 50
+    assert "Use Cases" in context
+
+
+def test_budgets_come_from_defaults_or_environment(monkeypatch):
+    assert context_budget("validate_requirements_quality") == 12000
+    assert context_budget("extract_requirements") is None
+    monkeypatch.setenv("CONTEXT_BUDGET_EXTRACT_REQUIREMENTS", "500")
+    assert context_budget("extract_requirements") == 500
+    assert budgeted_context("gather_business_text", "q", [("a", "one"), ("b", "two")]) == \
+        "one" + CONTEXT_DIVIDER + "two"
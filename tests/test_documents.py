@@ -0,0 +1,37 @@
+import zipfile
+
+from documents import parse_docx
+
+DOCUMENT_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    "<w:p><w:pPr><w:jc w:val=\"left\"/></w:pPr><w:r><w:t>Лимит &lt; 1 млн &amp; </w:t></w:r>"
+    '<w:r><w:t xml:space="preserve">статус &quot;Одобрено&quot;</w:t></w:r></w:p>'
+    "<w:p><w:r><w:t>Разметка &amp;lt;b&amp;gt; хранится как текст</w:t></w:r></w:p>"
+    "<w:p><w:r><w:t>Клиент&apos;s ID &#8470; 5</w:t></w:r></w:p>"
+    "<w:p><w:r><w:t>   </w:t></w:r></w:p>"
+    "</w:body></w:document>"
+)
+
+
+def test_docx_entities_are_unescaped_once(tmp_path):
+    path = tmp_path / "brief.docx"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", DOCUMENT_XML)
+    assert parse_docx(str(path)).splitlines() == [
+        'Лимит < 1 млн & статус "Одобрено"',
+        "Разметка &lt;b&gt; хранится как текст",
+        "Клиент's ID № 5",
+    ]
+
+
+def test_read_reparses_when_the_text_cache_misses(tmp_path, monkeypatch):
+    from documents import DocumentLibrary
+    from vector_index import VectorIndex, local_embed
+
+    monkeypatch.setenv("DOC_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("DOC_CACHE_READONLY", "1")
+    path = tmp_path / "brief.txt"
+    path.write_text("Лимит перевода 1 млн рублей", encoding="utf-8")
+    library = DocumentLibrary(index=VectorIndex(str(tmp_path / "index"), embed=local_embed))
+    assert library.read(str(path)) == "Лимит перевода 1 млн рублей"
@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+
+import pytest
+
+from instrumentation import METRIC_PREFIX, Tracer
+
+
+def test_nested_spans_record_parent_task_and_errors():
+    tracer = Tracer()
+    with tracer.span("task", "extract_requirements") as task:
+        with tracer.span("llm", "gpt-4o-mini", prompt_tokens=10) as llm:
+            with pytest.raises(ValueError):
+                with tracer.span("tool", "search"):
+                    raise ValueError("offline")
+    tool = tracer.spans[0]
+    assert (tool["parent"], tool["task"], tool["error"]) == (llm["id"], "extract_requirements", "ValueError: offline")
+    assert (llm["parent"], llm["task"]) == (task["id"], "extract_requirements")
+    assert task["parent"] is None and task["duration"] >= llm["duration"]
+
+
+def test_bound_owner_attributes_spans_from_timeout_threads():
+    tracer = Tracer()
+    owner = object()
+    spans = []
+
+    def agent_loop():
+        with tracer.span("llm", "model", owner=owner) as llm:
+            with tracer.span("tool", "search") as tool:
+                spans.extend([llm, tool])
+
+    with tracer.span("task", "use_cases") as task:
+        with tracer.bind(owner, task):
+            thread = threading.Thread(target=agent_loop)
+            thread.start()
+            thread.join()
+    assert [(span["parent"], span["task"]) for span in spans] == [(task["id"], "use_cases"), (spans[0]["id"], "use_cases")]
+
+    thread = threading.Thread(target=agent_loop)
+    spans.clear()
+    thread.start()
+    thread.join()
+    assert spans[0]["task"] is None
+
+
+def test_span_history_is_capped_and_resettable():
+    tracer = Tracer(max_spans=3)
+    for index in range(5):
+        with tracer.span("tool", f"t{index}"):
+            pass
+    assert [span["name"] for span in tracer.spans] == ["t2", "t3", "t4"]
+    tracer.reset()
+    assert not tracer.spans
+
+
+def test_json_and_prometheus_exports(tmp_path):
+    tracer = Tracer()
+    before = time.time()
+    with tracer.span("task", 'say "hi"'):
+        with tracer.span("llm", "model", prompt_tokens=7, completion_tokens=3, cache_hit=True):
+            pass
+        with tracer.span("llm", "model", prompt_tokens=5):
+            pass
+    tracer.export_json(str(tmp_path / "trace.json"))
+    tracer.export_prometheus(str(tmp_path / "metrics.prom"))
+
+    spans = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))["spans"]
+    assert len(spans) == 3
+    assert all(before - 1 <= span["start"] <= span["end"] <= time.time() + 1 for span in spans)
+
+    metrics = (tmp_path / "metrics.prom").read_text(encoding="utf-8").splitlines()
+    labels = 'kind="llm",name="model",task="say \\"hi\\""'
+    assert f"{METRIC_PREFIX}_prompt_tokens_total{{{labels}}} 12" in metrics
+    assert f"{METRIC_PREFIX}_spans_total{{{labels}}} 2" in metrics
+    assert f"{METRIC_PREFIX}_cache_hits_total{{{labels}}} 1" in metrics
+    assert f"# TYPE {METRIC_PREFIX}_errors_total counter" in metrics
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import pytest
+
+from cache import DiskCache
+from pipeline_cache import PipelineCache, normalize_problem, pipeline_definition
+
+LONG_PROBLEM = ("Автоматизировать проверку клиента при открытии счета: клиент загружает паспорт, "
+                "система сверяет данные с госреестром и отправляет код подтверждения по {channel}. "
+                "Ответ клиенту не позднее 15 минут.")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PipelineCache(DiskCache(str(tmp_path / "pipeline")))
+
+
+def store(cache, problem, attachments=(), definition=""):
+    cache.save(problem, problem[:50], "publish_to_confluence", {"publish_to_confluence": problem},
+               attachments, definition)
+
+
+def make_task(description="Extract requirements", model="gpt-4o-mini"):
+    agent = SimpleNamespace(role="Analyst", goal="Requirements", backstory="Bank BA",
+                            llm=SimpleNamespace(model=model, max_tokens=None), tools=[])
+    return SimpleNamespace(name="extract_requirements", description=description,
+                           expected_output="List", agent=agent)
+
+
+def test_paraphrase_with_generic_verb_shares_a_result(cache):
+    assert normalize_problem("Улучшение процесса KYC") == normalize_problem("Оптимизация KYC процесса")
+    store(cache, "Улучшение процесса KYC")
+    assert cache.lookup("Оптимизация KYC процесса")["topic"] == "Улучшение процесса KYC"
+
+
+@pytest.mark.parametrize("stored, requested", [
+    ("Клиент не должен загружать паспорт", "Клиент должен загружать паспорт"),
+    ("Кредит без залога до 1 млн", "Кредит с залогом до 1 млн"),
+    ("Кредит до 1 млн", "Кредит до 5 млн"),
+    ("Кредит до 1 млн", "Кредит от 1 млн"),
+    ("Не улучшать процесс KYC", "Улучшать процесс KYC"),
+    (LONG_PROBLEM.format(channel="SMS"), LONG_PROBLEM.format(channel="push")),
+    (LONG_PROBLEM.format(channel="SMS"), LONG_PROBLEM.format(channel="SMS") + " Исключить проверку БКИ."),
+    ("Управление кредиторской задолженностью", "Управление кредитной задолженностью"),
+    ("Оценка платежеспособности клиентов", "Оценка платежей клиентов"),
+])
+def test_near_misses_are_not_served(cache, stored, requested):
+    assert normalize_problem(stored) != normalize_problem(requested)
+    store(cache, stored)
+    assert cache.lookup(requested) is None
+    assert cache.lookup(stored) is not None
+
+
+def test_negation_binds_to_the_following_word():
+    assert normalize_problem("не A, B") != normalize_problem("A, не B")
+
+
+def test_attachments_are_part_of_the_key(cache):
+    store(cache, "Улучшение процесса KYC", ["policy-v1"])
+    assert cache.lookup("Улучшение процесса KYC") is None
+    assert cache.lookup("Улучшение процесса KYC", ["policy-v2"]) is None
+    assert cache.lookup("Улучшение процесса KYC", ["policy-v1"]) is not None
+
+
+def test_stats_and_read_only(tmp_path):
+    read_only = PipelineCache(DiskCache(str(tmp_path / "pipeline"), read_only=True))
+    store(read_only, "Улучшение процесса KYC")
+    assert read_only.lookup("Улучшение процесса KYC") is None
+    assert read_only.stats() == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+
+
+def test_pipeline_definition_is_part_of_the_key(cache):
+    definition = pipeline_definition([make_task()])
+    store(cache, "Улучшение процесса KYC", definition=definition)
+    assert cache.lookup("Улучшение процесса KYC", definition=definition) is not None
+    for changed in (pipeline_definition([make_task(description="Extract and rank requirements")]),
+                    pipeline_definition([make_task(model="gpt-4o")]),
+                    pipeline_definition([make_task()], {"extract_requirements": [{"max_tokens": 800}]})):
+        assert changed != definition
+        assert cache.lookup("Улучшение процесса KYC", definition=changed) is None
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from chunking import count_tokens
+from context_budget import CONTEXT_DIVIDER
+from prompts import PrefixTracker, append_brief, common_prefix, project_brief
+
+
+def test_brief_is_appended_after_the_context():
+    task = SimpleNamespace(brief=project_brief("KYC", "Улучшить KYC"))
+    assert task.brief == "PROJECT BRIEF\n- Topic: KYC\n- Business need as stated by the user: Улучшить KYC"
+    assert append_brief("BRD", task) == "BRD" + CONTEXT_DIVIDER + task.brief
+    assert append_brief("", task) == task.brief
+    assert append_brief("BRD", SimpleNamespace()) == "BRD"
+
+
+def test_common_prefix_length():
+    assert common_prefix("abcdef", "abcxyz") == 3
+    assert common_prefix("abc", "abcdef") == 3
+    assert common_prefix("", "abc") == 0
+
+
+def test_tracker_measures_the_longest_prefix_per_model():
+    tracker = PrefixTracker(history=2)
+    shared = "Stable task description. " * 20
+    assert tracker.observe("gpt", shared + "brief A") == 0
+    assert tracker.observe("other", shared + "brief B") == 0
+    assert tracker.observe("gpt", shared + "brief B") == count_tokens(shared + "brief ")
+    tracker.observe("gpt", "unrelated one")
+    tracker.observe("gpt", "unrelated two")
+    assert tracker.observe("gpt", shared + "brief C") == 0
+
+
+def test_only_the_brief_differs_between_problems():
+    from tasks import create_tasks
+
+    first, _ = create_tasks("Улучшение KYC", "Улучшить процесс KYC")
+    second, _ = create_tasks("Кредитный скоринг", "Автоматизировать скоринг")
+    tracker = PrefixTracker()
+    for a, b in zip(first, second):
+        assert (a.description, a.expected_output) == (b.description, b.expected_output)
+        assert a.brief != b.brief
+        prompt_a = f"{a.description}\n{a.expected_output}\n{append_brief('CONTEXT', a)}"
+        prompt_b = f"{b.description}\n{b.expected_output}\n{append_brief('CONTEXT', b)}"
+        tracker.observe(a.name, prompt_a)
+        shared = tracker.observe(a.name, prompt_b)
+        assert shared >= count_tokens(prompt_a) - count_tokens(a.brief) - 2
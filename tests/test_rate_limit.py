@@ -0,0 +1,64 @@
+import pytest
+
+import rate_limit
+from rate_limit import RateLimiter, RateLimitExhausted, exhausted_cause, is_rate_limit_error
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_rate_limits_are_recognised_by_status_or_type():
+    assert is_rate_limit_error(HTTPError(429))
+    assert is_rate_limit_error(RateLimitError("slow down"))
+    assert not is_rate_limit_error(HTTPError(500))
+    assert not is_rate_limit_error(ValueError("order 429 not found"))
+    assert not is_rate_limit_error(RuntimeError("rate limit for this field exceeded in form"))
+
+
+def test_wrapped_rate_limit_is_recognised():
+    try:
+        try:
+            raise HTTPError(429)
+        except HTTPError as e:
+            raise RuntimeError("Task execution failed") from e
+    except RuntimeError as wrapped:
+        assert is_rate_limit_error(wrapped)
+
+
+def test_exhaustion_is_not_retried_and_survives_wrapping(monkeypatch):
+    monkeypatch.setattr(rate_limit, "BASE_DELAY", 0.001)
+    limiter = RateLimiter("test", max_retries=2)
+    calls = []
+
+    def always_limited():
+        calls.append(1)
+        raise HTTPError(429)
+
+    with pytest.raises(RateLimitExhausted) as raised:
+        limiter.call(always_limited)
+    assert len(calls) == 3
+    assert isinstance(raised.value, TimeoutError)
+    try:
+        try:
+            raise raised.value
+        except TimeoutError:
+            raise TimeoutError("Task execution timed out")
+    except TimeoutError as wrapped:
+        assert exhausted_cause(wrapped) is raised.value
+    assert exhausted_cause(ValueError("other")) is None
+
+
+def test_share_divides_limits_between_processes():
+    limiter = RateLimiter("test", rpm=500, tpm=200000)
+    limiter.set_share(1 / 4)
+    assert (limiter.requests.capacity, limiter.tokens.capacity) == (125, 50000)
+    limiter.set_share(1 / 2)
+    assert (limiter.requests.capacity, limiter.tokens.capacity) == (250, 100000)
+    assert RateLimiter("search").requests is None
@@ -0,0 +1,70 @@
+from multiprocessing import Pool
+from types import SimpleNamespace
+
+import routing
+from routing import Router, route_id
+
+
+def record_outcomes(args):
+    path, worker = args
+    router = Router({}, path)
+    route = router.candidates("extract_requirements")[0]
+    for _ in range(5):
+        router.record([("extract_requirements", route, float(worker), True)])
+
+
+def test_default_routes_are_uncapped():
+    for task in routing.DEFAULT_ROUTES:
+        assert [route["max_tokens"] for route in Router().candidates(task)] == [None]
+
+
+def test_capped_last_candidate_falls_back_to_an_uncapped_one():
+    router = Router({"create_process_diagrams": [{"max_tokens": 2048}]}, None)
+    assert [route["max_tokens"] for route in router.candidates("create_process_diagrams")] == [2048, None]
+
+
+def test_failing_route_is_abandoned_after_min_samples(tmp_path):
+    router = Router({"extract_requirements": [{"max_tokens": 60}, {"model": "gpt-4o"}]},
+                    str(tmp_path / "stats.json"))
+    cheap, fallback = router.candidates("extract_requirements")
+    for _ in range(routing.MIN_SAMPLES):
+        assert router.select("extract_requirements") == cheap
+        router.record([("extract_requirements", cheap, 1.0, False)])
+    assert router.select("extract_requirements") == fallback
+
+
+def test_truncated_output_fails_the_route(tmp_path):
+    router = Router({}, str(tmp_path / "stats.json"))
+    route = router.candidates("extract_requirements")[0]
+    task = SimpleNamespace(name="extract_requirements", route=route)
+    outputs = {"extract_requirements": SimpleNamespace(raw="## Functional Requirements\n- **FR-001:** ...")}
+    timing = {"duration": 2.0, "cached": False}
+    router.record_pipeline([task], {"extract_requirements": dict(timing, truncated=True)}, outputs)
+    router.record_pipeline([task], {"extract_requirements": dict(timing, truncated=False)}, outputs)
+    assert [passed for passed, _ in router.outcomes("extract_requirements", route)] == [False, True]
+
+
+def test_validator_report_does_not_fail_its_own_route(tmp_path):
+    router = Router({}, str(tmp_path / "stats.json"))
+    names = ("generate_use_cases_and_user_stories", "validate_requirements_quality")
+    tasks = [SimpleNamespace(name=name, route=router.candidates(name)[0]) for name in names]
+    outputs = {
+        "generate_use_cases_and_user_stories": SimpleNamespace(
+            raw="### UC-001: Submit\n\n## Traceability Matrix\n| FR-001 | UC-001 |\n"),
+        "validate_requirements_quality": SimpleNamespace(
+            raw="## Traceability review\n| FR-404 | UC-404 |\n"),
+    }
+    timings = {name: {"duration": 1.0, "cached": False} for name in names}
+    router.record_pipeline(tasks, timings, outputs)
+    assert [passed for passed, _ in router.outcomes(names[0], tasks[0].route)] == [False]
+    assert [passed for passed, _ in router.outcomes(names[1], tasks[1].route)] == [True]
+
+
+def test_concurrent_processes_do_not_lose_outcomes(tmp_path):
+    path = str(tmp_path / "stats.json")
+    with Pool(4) as pool:
+        pool.map(record_outcomes, [(path, worker) for worker in range(4)])
+    router = Router({}, path)
+    route = router.candidates("extract_requirements")[0]
+    assert len(router.outcomes("extract_requirements", route)) == 20
+    assert route_id(route) == "gpt-4o-mini/-/3/300s"
@@ -0,0 +1,154 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import scheduler
+from scheduler import TaskScheduler, build_graph, critical_path, topological_order
+
+
+def make_agent(role):
+    return SimpleNamespace(role=role, goal=role, backstory=role, llm=SimpleNamespace(model="mock", max_tokens=None),
+                           tools=[])
+
+
+def make_task(name, context=(), agent=None):
+    agent = agent or make_agent(name)
+    return SimpleNamespace(name=name, description=name, expected_output=name, context=list(context),
+                           agent=agent, sections={}, output=None)
+
+
+@pytest.fixture
+def executed(monkeypatch):
+    log = []
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def fake_execute(task, context):
+        with lock:
+            log.append(("start", task.name))
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+            log.append(("end", task.name))
+        return SimpleNamespace(raw=f"{task.name} output")
+
+    monkeypatch.setattr(scheduler, "execute_task", fake_execute)
+    monkeypatch.setattr(scheduler, "build_context", lambda task, upstream: "")
+    return SimpleNamespace(log=log, active=active)
+
+
+def test_topological_order_follows_context_edges():
+    a = make_task("a")
+    b = make_task("b", [a])
+    c = make_task("c", [a])
+    d = make_task("d", [b, c])
+    order = topological_order(build_graph([d, c, b, a]))
+    assert order.index("a") < order.index("b") < order.index("d")
+    assert order.index("c") < order.index("d")
+
+
+def test_cycles_and_foreign_dependencies_are_rejected():
+    a = make_task("a")
+    b = make_task("b", [a])
+    a.context = [b]
+    with pytest.raises(ValueError, match="Cycle"):
+        TaskScheduler([a, b])
+    with pytest.raises(ValueError, match="outside the graph"):
+        build_graph([make_task("c", [make_task("x")])])
+
+
+def test_critical_path_uses_longest_chain():
+    graph = {"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"]}
+    path, total = critical_path(graph, {"a": 1.0, "b": 5.0, "c": 2.0, "d": 1.0})
+    assert path == ["a", "b", "d"]
+    assert total == pytest.approx(7.0)
+
+
+def test_independent_tasks_run_concurrently(executed):
+    a = make_task("a")
+    tasks = [a, make_task("b", [a]), make_task("c", [a])]
+    outputs = TaskScheduler(tasks, max_workers=3).run()
+    assert set(outputs) == {"a", "b", "c"}
+    assert executed.log[:2] == [("start", "a"), ("end", "a")]
+    assert executed.active["peak"] == 2
+
+
+def test_tasks_sharing_an_agent_never_overlap(executed):
+    shared = make_agent("analyst")
+    a = make_task("a")
+    tasks = [a, make_task("b", [a], shared), make_task("c", [a], shared)]
+    TaskScheduler(tasks, max_workers=3).run()
+    assert executed.active["peak"] == 1
+
+
+def test_stored_outputs_skip_execution(executed, tmp_path):
+    from cache import DiskCache
+    from task_store import TaskStore
+
+    store = TaskStore(DiskCache(str(tmp_path / "store")))
+    a = make_task("a")
+    tasks = [a, make_task("b", [a])]
+    TaskScheduler(tasks, store=store).run()
+    executed.log.clear()
+    rerun = TaskScheduler(tasks, store=store)
+    rerun.run()
+    assert executed.log == []
+    assert all(timing["cached"] for timing in rerun.timings.values())
+
+
+def test_changed_definitions_invalidate_only_their_task(executed, tmp_path):
+    from cache import DiskCache
+    from task_store import TaskStore
+
+    store = TaskStore(DiskCache(str(tmp_path / "store")))
+    a = make_task("a")
+    b = make_task("b", [a])
+    TaskScheduler([a, b], store=store).run()
+    executed.log.clear()
+    b.description = "b, reworded"
+    TaskScheduler([a, b], store=store).run()
+    assert executed.log == [("start", "b"), ("end", "b")]
+    executed.log.clear()
+    a.description = "a, reworded"
+    TaskScheduler([a, b], store=store).run()
+    assert executed.log == [("start", "a"), ("end", "a")]
+
+
+def test_sections_start_dependents_early_but_completed_outputs_are_passed_whole(monkeypatch):
+    contexts = {}
+    b_started = threading.Event()
+    full = "## Functional Requirements\n- FR-001\n\n## Risks\n- none\n"
+
+    def fake_execute(task, context):
+        if task.name == "a":
+            stream = run.streams["a"]
+            stream.feed("Thought: done\nFinal Answer: ## Functional Requirements\n- FR-001\n\n")
+            stream.feed("## Risks\n")
+            assert b_started.wait(5)
+        else:
+            b_started.set()
+        return SimpleNamespace(raw=full if task.name == "a" else f"{task.name} output")
+
+    monkeypatch.setattr(scheduler, "execute_task", fake_execute)
+    monkeypatch.setattr(scheduler, "build_context", lambda task, upstream: contexts.setdefault(task.name, upstream))
+    a = make_task("a")
+    b = make_task("b", [a])
+    c = make_task("c", [a, b])
+    b.sections = {"a": ["Functional Requirements"]}
+    c.sections = {"a": ["Risks"]}
+    run = TaskScheduler([a, b, c], max_workers=2, pipelined=True)
+    run.run()
+    assert run.timings["b"]["early"] == ["a"]
+    assert contexts["b"] == {"a": "## Functional Requirements\n- FR-001"}
+    assert run.timings["c"]["early"] == []
+    assert contexts["c"] == {"a": full, "b": "b output"}
+
+
+def test_pipelining_needs_a_second_worker():
+    a = make_task("a")
+    assert not TaskScheduler([a], max_workers=1, pipelined=True).pipelined
+    assert TaskScheduler([a], max_workers=2, pipelined=True).pipelined
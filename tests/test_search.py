@@ -0,0 +1,94 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import search
+from search import SearchClient, normalize_query
+
+
+def test_queries_are_normalized():
+    assert normalize_query("  KYC   Regulations? ") == normalize_query("kyc regulations")
+
+
+def test_concurrent_identical_queries_share_one_backend_call():
+    calls = []
+    release = threading.Event()
+
+    def backend(query):
+        calls.append(query)
+        release.wait(5)
+        return f"result for {query}"
+
+    client = SearchClient(backend)
+    results = []
+    threads = [threading.Thread(target=lambda q=q: results.append(client.search(q)))
+               for q in ("KYC rules", "kyc rules", "KYC  rules?", "kyc rules.")]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while client.collapsed < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert results == [f"result for {calls[0]}"] * 4
+    assert client.stats() == {"hits": 0, "misses": 1, "collapsed": 3, "entries": 1}
+
+
+def test_results_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(search, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    calls = []
+    client = SearchClient(lambda query: calls.append(query) or len(calls), ttl=60)
+    assert client.search("aml") == 1
+    now[0] += 59
+    assert client.search("aml") == 1
+    now[0] += 2
+    assert client.search("aml") == 2
+    assert (client.hits, client.misses) == (1, 2)
+
+
+def test_least_recently_used_entries_are_evicted():
+    calls = []
+    client = SearchClient(lambda query: calls.append(query) or query, max_entries=2)
+    client.search("a")
+    client.search("b")
+    client.search("a")
+    client.search("c")
+    client.search("a")
+    client.search("b")
+    assert calls == ["a", "b", "c", "b"]
+
+
+def test_failures_reach_waiting_callers_and_are_not_cached():
+    release = threading.Event()
+    attempts = []
+
+    def backend(query):
+        attempts.append(query)
+        if len(attempts) == 1:
+            release.wait(5)
+            raise ValueError("backend down")
+        return "ok"
+
+    client = SearchClient(backend)
+    errors = []
+
+    def run():
+        try:
+            client.search("kyc")
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while client.collapsed < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["backend down"] * 2
+    assert client.search("kyc") == "ok"
@@ -0,0 +1,46 @@
+import asyncio
+
+import service
+from service import AnalystService
+
+
+def finished_job(number):
+    return {"id": str(number), "status": "done", "finished_at": float(number)}
+
+
+def test_finished_jobs_are_kept_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(service, "MAX_FINISHED_JOBS", 1000)
+    analyst = AnalystService(workers=1, queue_size=1)
+    analyst.jobs = {str(number): finished_job(number) for number in range(600)}
+    analyst.jobs["running"] = {"id": "running", "status": "running", "finished_at": None}
+    analyst._forget_old_jobs()
+    assert len(analyst.jobs) == 601
+
+
+def test_oldest_finished_jobs_are_forgotten_over_the_cap(monkeypatch):
+    monkeypatch.setattr(service, "MAX_FINISHED_JOBS", 10)
+    analyst = AnalystService(workers=1, queue_size=1)
+    analyst.jobs = {str(number): finished_job(number) for number in range(15)}
+    analyst._forget_old_jobs()
+    assert sorted(analyst.jobs, key=int) == [str(number) for number in range(5, 15)]
+
+
+def request(raw: bytes) -> bytes:
+    async def exchange():
+        server = await asyncio.start_server(AnalystService(workers=1, queue_size=1).handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(raw)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    return asyncio.run(exchange())
+
+
+def test_malformed_content_length_is_a_bad_request():
+    response = request(b"POST /jobs HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert b"Content-Length" in response
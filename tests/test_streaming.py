@@ -0,0 +1,70 @@
+import threading
+from types import SimpleNamespace
+
+from streaming import (DRAFT_NOTICE, SECTION_TITLES, ReportWriter, heading_sections, is_draft,
+                       pipelining_enabled, select_sections, streaming_enabled)
+
+BRD = ("# BRD\n\n## 1. Business Goals\n- Faster onboarding\n\n"
+       "## 2. **Functional Requirements**\n- FR-001\n### Details\n- scans\n\n"
+       "## Non-Functional Requirements\n- NFR-001\n")
+
+
+def test_report_is_a_draft_until_the_final_task_replaces_it(tmp_path):
+    path = tmp_path / "report.txt"
+    writer = ReportWriter(str(path), final_task="validate_requirements_quality", title="KYC")
+    writer.section("extract_requirements", "## Functional Requirements\n- FR-001\n")
+    writer.on_complete("generate_use_cases_and_user_stories", SimpleNamespace(raw="UC-001"))
+
+    draft = path.read_text(encoding="utf-8")
+    assert draft.startswith(f"# KYC\n\n{DRAFT_NOTICE}\n\n")
+    assert draft.index(SECTION_TITLES["extract_requirements"]) < \
+        draft.index(SECTION_TITLES["generate_use_cases_and_user_stories"])
+    assert "- FR-001\n\n## " in draft and is_draft(str(path))
+
+    writer.task_callback(SimpleNamespace(name="validate_requirements_quality", raw="# Итоговый отчет"))
+    assert path.read_text(encoding="utf-8") == "# Итоговый отчет"
+    assert not is_draft(str(path))
+    assert [p.name for p in tmp_path.iterdir()] == ["report.txt"]
+
+
+def test_concurrent_sections_are_appended_whole(tmp_path):
+    path = tmp_path / "report.txt"
+    writer = ReportWriter(str(path), final_task="final")
+    bodies = {f"task{i}": f"строка {i}\n" * 200 for i in range(8)}
+    threads = [threading.Thread(target=writer.section, args=item) for item in bodies.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    text = path.read_text(encoding="utf-8")
+    assert text.count(DRAFT_NOTICE) == 1
+    for name, body in bodies.items():
+        assert f"## {name}\n\n{body.strip()}\n\n" in text
+
+
+def test_stream_flags(monkeypatch):
+    monkeypatch.delenv("PIPELINED_SECTIONS", raising=False)
+    monkeypatch.setenv("LLM_STREAM", "0")
+    assert not streaming_enabled() and not pipelining_enabled()
+    monkeypatch.setenv("LLM_STREAM", "True")
+    assert streaming_enabled() and pipelining_enabled()
+    monkeypatch.setenv("PIPELINED_SECTIONS", "0")
+    assert not pipelining_enabled()
+
+
+def test_heading_sections_skip_the_open_section_of_a_partial_stream():
+    partial = BRD[:BRD.index("- NFR-001")]
+    assert [heading for heading, _ in heading_sections(BRD)] == [
+        "BRD", "1. Business Goals", "2. **Functional Requirements**", "Details", "Non-Functional Requirements"]
+    assert [heading for heading, _ in heading_sections(partial, complete=False)] == [
+        "1. Business Goals", "2. **Functional Requirements**", "Details"]
+
+
+def test_select_sections_matches_titles_and_waits_for_all_names():
+    requirements = "## 2. **Functional Requirements**\n- FR-001\n### Details\n- scans"
+    assert select_sections(BRD, ["Functional Requirement"]) == requirements
+    assert select_sections(BRD, ["functional requirements", "Business Goals"]) == (
+        requirements + "\n\n## 1. Business Goals\n- Faster onboarding")
+    assert select_sections(BRD, ["Use Cases"]) is None
+    partial = BRD[:BRD.index("### Details")]
+    assert select_sections(partial, ["Functional Requirements"], complete=False) is None
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+from cache import DiskCache
+from task_store import TaskStore, task_key
+
+
+def make_task(description="Write the BRD", output_file=None):
+    agent = SimpleNamespace(role="Analyst", goal="goal", backstory="backstory",
+                            llm=SimpleNamespace(model="gpt-4o-mini", max_tokens=None), tools=[])
+    return SimpleNamespace(description=description, expected_output="BRD", brief="PROJECT BRIEF",
+                           agent=agent, output_file=output_file)
+
+
+def test_key_changes_with_upstream_output():
+    task = make_task()
+    assert task_key(task, ["dialogue"]) == task_key(task, ["dialogue"])
+    assert task_key(task, ["dialogue"]) != task_key(task, ["edited dialogue"])
+
+
+def test_key_changes_with_task_definition():
+    assert task_key(make_task(), ["dialogue"]) != task_key(make_task("Write the SRS"), ["dialogue"])
+
+
+def test_key_covers_attachment_digests():
+    task = make_task()
+    plain = task_key(task, ["dialogue"])
+    assert task_key(task, ["dialogue"], []) == plain
+    attached = task_key(task, ["dialogue"], ["aaa", "bbb"])
+    assert attached != plain
+    assert task_key(task, ["dialogue"], ["bbb", "aaa"]) == attached
+    assert task_key(task, ["dialogue"], ["aaa", "ccc"]) != attached
+
+
+def test_store_round_trip(tmp_path):
+    store = TaskStore(DiskCache(str(tmp_path / "store")))
+    task = make_task(output_file=str(tmp_path / "out.md"))
+    key = task_key(task, [])
+    assert store.load(task, key) is None
+    store.save(key, SimpleNamespace(raw="# BRD"))
+    assert store.load(task, key).raw == "# BRD"
+    assert (tmp_path / "out.md").read_text(encoding="utf-8") == "# BRD"
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from validators import defined_ids, mermaid_errors, user_stories, validate_outputs
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def outputs():
+    return {
+        "extract_requirements": fixture("brd.md"),
+        "generate_use_cases_and_user_stories": fixture("use_cases.md"),
+        "create_process_diagrams": fixture("diagrams.md"),
+    }
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("### Use Case UC-001: Submit documents", "UC-001"),
+    ("### User Story US-001: Upload passport", "US-001"),
+    ("- **Story ID:** US-001", "US-001"),
+    ("**Use Case ID:** UC-001", "UC-001"),
+    ("- **Use Case ID**: UC-001", "UC-001"),
+    ("- **FR-001:** The system shall accept scans.", "FR-001"),
+    ("| FR-01 | Accept scans |", "FR-001"),
+    ("#### UC-7 — Track status", "UC-007"),
+])
+def test_definition_formats(line, expected):
+    assert defined_ids(line) == {expected}
+
+
+def test_matrix_references_resolve(outputs):
+    issues, stats = validate_outputs(outputs)
+    assert [item for item in issues if item["check"] == "traceability"] == []
+    assert stats["matrix_ids"] == 7
+
+
+def test_missing_matrix_is_attributed_to_the_use_cases_output():
+    stories = "### Use Case UC-001: Submit documents\n"
+    issues, _ = validate_outputs({"extract_requirements": "- **FR-001:** Accept scans.",
+                                  "generate_use_cases_and_user_stories": stories})
+    assert [item["source"] for item in issues if item["check"] == "traceability"] == [
+        "generate_use_cases_and_user_stories"]
+    issues, _ = validate_outputs({"brd.md": "- **FR-001:** Accept scans.", "use_cases.md": stories})
+    assert [item["source"] for item in issues if item["check"] == "traceability"] == ["use_cases.md"]
+    issues, _ = validate_outputs({"extract_requirements": "- **FR-001:** Accept scans."})
+    assert [item for item in issues if item["check"] == "traceability"] == []
+
+
+def test_generated_use_cases_define_their_ids():
+    assert defined_ids(fixture("report_use_cases.md")) == {"UC-001", "UC-002"}
+
+
+def test_stories_are_split_and_checked_for_gherkin(outputs):
+    stories = user_stories(outputs["generate_use_cases_and_user_stories"])
+    assert sorted(stories) == ["US-001", "US-002", "US-003"]
+    assert "Invalid format" in stories["US-001"]
+    issues, stats = validate_outputs(outputs)
+    assert stats["user_stories"] == 3
+    gherkin = [item["message"] for item in issues if item["check"] == "acceptance_criteria"]
+    assert gherkin == ["US-003 acceptance criteria lack Gherkin steps: Given, When, Then"]
+
+
+def test_russian_prose_is_not_a_then_step():
+    story = ("### User Story US-010: Статус\n"
+             "- **Дано** клиент вошел в систему\n"
+             "- **Когда** он открывает страницу, то видит статус\n")
+    issues, _ = validate_outputs({"stories": story})
+    assert [item["message"] for item in issues if item["check"] == "acceptance_criteria"] == [
+        "US-010 acceptance criteria lack Gherkin steps: Then"]
+
+
+def test_valid_diagrams_pass(outputs):
+    issues, stats = validate_outputs(outputs)
+    assert stats["diagrams"] == 2
+    assert [item for item in issues if item["check"] == "mermaid"] == []
+
+
+@pytest.mark.parametrize("block, error", [
+    ("flowchart TD\n    A[Start --> B[End]\n", "unbalanced '[]'"),
+    ("flowchart TD\n    A[\"Start] --> B\n", "unterminated string literal"),
+    ("sequenceDiagram\n    loop every minute\n    A->>B: ping\n", "block(s) not closed"),
+    ("flowchar TD\n    A --> B\n", "unknown diagram type"),
+])
+def test_broken_diagrams_are_reported(block, error):
+    assert any(error in message for message in mermaid_errors(block))
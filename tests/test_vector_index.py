@@ -0,0 +1,120 @@
+import json
+import os
+from multiprocessing import Pool
+
+import pytest
+
+import vector_index
+from vector_index import VectorIndex, local_embed
+
+REPORT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "report.txt")
+
+
+def test_knowledge_base_answers_relevant_queries_with_local_embeddings(tmp_path, monkeypatch):
+    monkeypatch.delenv("EMBEDDING_PROVIDER", raising=False)
+    monkeypatch.delenv("VECTOR_INDEX_THRESHOLD", raising=False)
+    monkeypatch.setattr(vector_index, "_index", VectorIndex(str(tmp_path / "index"), embed=local_embed))
+    vector_index.get_index().ingest_text(
+        "KYC verification: the system verifies identification documents against government databases.\n\n"
+        "Customers upload passport scans through the online portal.", "report.txt")
+    assert "score" in vector_index.search_knowledge_base("document verification government database")
+    assert vector_index.search_knowledge_base("рецепт борща со сметаной").startswith("Ничего релевантного")
+
+
+@pytest.mark.skipif(not os.path.exists(REPORT), reason="report.txt is not present")
+def test_report_passages_clear_the_local_threshold(tmp_path):
+    index = VectorIndex(str(tmp_path / "index"), embed=local_embed)
+    index.ingest_file(REPORT)
+    threshold = vector_index.SIMILARITY_THRESHOLDS["local"]
+    assert index.search("customer uploads identification documents", threshold=threshold)
+
+
+def test_interrupted_add_does_not_resurface_stale_metadata(tmp_path):
+    directory = str(tmp_path / "index")
+    index = VectorIndex(directory, embed=local_embed)
+    index.add(["alpha passage", "beta passage"], "first")
+    with open(os.path.join(directory, "meta.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": 2, "source": "stale", "hash": "x", "text": "gamma passage"}) + "\n")
+        f.write('{"id": 3, "sou')
+
+    reloaded = VectorIndex(directory, embed=local_embed)
+    assert [entry["text"] for entry in reloaded.meta] == ["alpha passage", "beta passage"]
+    assert all(result["text"] != "gamma passage" for result in reloaded.search("gamma", limit=5))
+    with open(os.path.join(directory, "meta.jsonl"), encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+
+    reloaded.add(["delta passage"], "second")
+    again = VectorIndex(directory, embed=local_embed)
+    assert again.search("delta passage", limit=1)[0] == dict(again.meta[2], score=pytest.approx(1.0, abs=1e-4))
+    assert again.meta[2]["source"] == "second"
+
+
+def test_failed_embedding_leaves_passages_ingestable(tmp_path):
+    calls = []
+
+    def flaky_embed(texts):
+        calls.append(texts)
+        if len(calls) == 1:
+            raise ConnectionError("embedding service unavailable")
+        return local_embed(texts)
+
+    index = VectorIndex(str(tmp_path / "index"), embed=flaky_embed)
+    with pytest.raises(ConnectionError):
+        index.add(["alpha passage"], "first")
+    assert index.add(["alpha passage"], "first") == 1
+    assert index.add(["alpha passage"], "first") == 0
+
+
+def short_embed(texts):
+    return local_embed(texts, dim=16)
+
+
+def test_changed_embedder_is_refused_until_rebuilt(tmp_path, monkeypatch):
+    directory = str(tmp_path / "index")
+    VectorIndex(directory, embed=local_embed).add(["alpha passage", "beta passage"], "first")
+
+    switched = VectorIndex(directory, embed=short_embed)
+    with pytest.raises(vector_index.EmbedderMismatch, match="rebuild"):
+        switched.search("alpha")
+    with pytest.raises(vector_index.EmbedderMismatch):
+        switched.add(["gamma passage"], "second")
+    monkeypatch.setattr(vector_index, "_index", switched)
+    assert vector_index.search_knowledge_base("alpha").startswith("Ошибка при поиске в базе знаний")
+
+    assert switched.rebuild() == 2
+    assert switched.search("alpha passage", limit=1)[0]["text"] == "alpha passage"
+    reopened = VectorIndex(directory, embed=short_embed)
+    assert (reopened.state["dim"], reopened.state["embedder"]) == (16, "short_embed")
+    assert [entry["source"] for entry in reopened.meta] == ["first", "first"]
+
+
+def test_indexes_without_a_recorded_embedder_check_the_dimension(tmp_path):
+    directory = str(tmp_path / "index")
+    VectorIndex(directory, embed=local_embed).add(["alpha passage"], "first")
+    state_path = os.path.join(directory, "state.json")
+    with open(state_path, encoding="utf-8") as f:
+        state = json.load(f)
+    del state["embedder"]
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    with pytest.raises(vector_index.EmbedderMismatch, match="512 dimensions"):
+        VectorIndex(directory, embed=short_embed).search("alpha")
+    assert VectorIndex(directory, embed=local_embed).search("alpha passage", limit=1)
+
+
+def add_passages(args):
+    directory, worker = args
+    index = VectorIndex(directory, embed=local_embed)
+    for batch in range(5):
+        index.add([f"worker {worker} passage {batch} {i}" for i in range(3)], f"worker-{worker}")
+
+
+def test_processes_sharing_an_index_do_not_overwrite_each_other(tmp_path):
+    directory = str(tmp_path / "index")
+    with Pool(4) as pool:
+        pool.map(add_passages, [(directory, worker) for worker in range(4)])
+    index = VectorIndex(directory, embed=local_embed)
+    assert index.state["count"] == len(index.meta) == 60
+    assert [entry["id"] for entry in index.meta] == list(range(60))
+    for entry in (index.meta[0], index.meta[31], index.meta[59]):
+        assert index.search(entry["text"], limit=1)[0]["text"] == entry["text"]
@@ -0,0 +1,75 @@
+import time
+import threading
+import importlib
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+from instrumentation import trace_tool
+
+_TOOL_SPECS = {
+    "code_interpreter": ("crewai_tools", "CodeInterpreterTool", {}),
+    "vision": ("crewai_tools", "VisionTool", {}),
+    "serper": ("crewai_tools", "SerperDevTool", {}),
+}
+
+_builders: Dict[str, Callable] = {}
+_instances = {}
+_timings: List[tuple] = []
+_lock = threading.RLock()
+
+
+@contextmanager
+def timed(label: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _timings.append((label, time.perf_counter() - started))
+
+
+def register_tool(name: str, builder: Callable) -> None:
+    with _lock:
+        _builders[name] = builder
+        _instances.pop(name, None)
+
+
+def _build(name: str):
+    if name in _builders:
+        with timed(f"construct {name}"):
+            return _builders[name]()
+    if name not in _TOOL_SPECS:
+        raise KeyError(f"Unknown tool: {name}")
+    module_name, class_name, kwargs = _TOOL_SPECS[name]
+    with timed(f"import {module_name}.{class_name}"):
+        tool_class = getattr(importlib.import_module(module_name), class_name)
+    with timed(f"construct {name}"):
+        return tool_class(**kwargs)
+
+
+def get_tool(name: str):
+    with _lock:
+        if name not in _instances:
+            _instances[name] = trace_tool(_build(name), name)
+        return _instances[name]
+
+
+def get_tools(*names: str) -> list:
+    return [get_tool(name) for name in names]
+
+
+def function_tool(function: Callable, name: str, description: str):
+    from crewai_tools import LlamaIndexTool
+    from llama_index.core.tools import FunctionTool
+
+    return LlamaIndexTool.from_tool(FunctionTool.from_defaults(function, name=name, description=description))
+
+
+def startup_report() -> str:
+    with _lock:
+        timings = list(_timings)
+    total = sum(seconds for _, seconds in timings)
+    lines = [f"Startup timings ({total:.2f}s total):"]
+    for label, seconds in sorted(timings, key=lambda item: item[1], reverse=True):
+        lines.append(f"  {label:<50} {seconds * 1000:8.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,254 @@
+import re
+import sys
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+from instrumentation import tracer
+
+VALIDATED_TASKS = ("validate_requirements_quality",)
+MATRIX_SOURCE = "generate_use_cases_and_user_stories"
+ID_PATTERN = re.compile(r"\b(FR|NFR|BR|UC|US)-?(\d{1,4})\b")
+ID_LABEL = (r"(?:(?:use[ \t]+case|user[ \t]+story|story|requirement|требование|сценарий использования|"
+            r"пользовательская история|история)(?:[ \t]+id)?|id)")
+EMPHASIS = r"(?:[*_]{1,2})?"
+DEFINITION_PATTERN = re.compile(
+    rf"^[ \t]*(?:#{{1,6}}[ \t]*|[-*+][ \t]*|\d+[.)][ \t]*|\|[ \t]*)?{EMPHASIS}"
+    rf"(?:{ID_LABEL}[ \t]*:?[ \t]*{EMPHASIS}[ \t]*:?[ \t]*)?{EMPHASIS}"
+    r"(FR|NFR|BR|UC|US)-?(\d{1,4})\b", re.M | re.I)
+MATRIX_HEADING = re.compile(r"^#{1,6}.*(traceab|трассир)", re.I | re.M)
+HEADING = re.compile(r"^#{1,6}\s", re.M)
+MERMAID_BLOCK = re.compile(r"```mermaid\s*\n(.*?)```", re.S)
+MERMAID_STRING = re.compile(r'"[^"\n]*"')
+ASYMMETRIC_NODE = re.compile(r"(?<=\w)>[^\[\]\n]*\]")
+GHERKIN_STEPS = {
+    "given": ("given", "дано", "допустим", "пусть"),
+    "when": ("when", "когда", "если"),
+    "then": ("then", "тогда", "то"),
+}
+GHERKIN_STEP = re.compile(r"^[ \t>]*(?:[-*+]|\d+[.)])?[ \t]*(?:[*_]{1,2})?(\w+)", re.M)
+MERMAID_TYPES = ("flowchart", "graph", "sequenceDiagram", "classDiagram", "stateDiagram",
+                 "stateDiagram-v2", "erDiagram", "journey", "gantt", "pie", "mindmap", "timeline",
+                 "requirementDiagram", "C4Context", "gitGraph", "quadrantChart", "block-beta")
+SEQUENCE_LINE = re.compile(
+    r"^(participant|actor|autonumber|activate|deactivate|note|title|box|rect|loop|alt|else|opt|par|and|"
+    r"critical|option|break|end)\b|^[^\s\-<>]+[^\-<>]*\s*(-{1,2}>{1,2}|-{1,2}[x)]|<<-{1,2}>>)[+-]?\s*[^:]+:",
+    re.I)
+FLOW_EDGE = re.compile(r"(-->|---|-\.->|==>|-\.-|===|--[ox]|<-->|--\s[^-]+\s-->|==\s[^=]+\s==>|~~~)")
+BLOCK_OPENERS = {
+    "flowchart": ("subgraph",),
+    "graph": ("subgraph",),
+    "sequenceDiagram": ("loop", "alt", "opt", "par", "critical", "break", "rect", "box"),
+}
+SEVERITY_ORDER = ("critical", "high", "medium", "low")
+
+
+def issue(check: str, severity: str, source: str, message: str) -> dict:
+    return {"check": check, "severity": severity, "source": source, "message": message}
+
+
+def normalize_id(prefix: str, number: str) -> str:
+    return f"{prefix.upper()}-{int(number):03d}"
+
+
+def defined_ids(text: str) -> set:
+    return {normalize_id(prefix, number) for prefix, number in DEFINITION_PATTERN.findall(text)}
+
+
+def referenced_ids(text: str) -> set:
+    return {normalize_id(prefix, number) for prefix, number in ID_PATTERN.findall(text)}
+
+
+def heading_level(line: str) -> int:
+    return len(line) - len(line.lstrip("#"))
+
+
+def section_end(text: str, start: int, level: int) -> int:
+    line_end = text.find("\n", start)
+    if line_end < 0:
+        return len(text)
+    for match in HEADING.finditer(text, line_end + 1):
+        if heading_level(match.group(0).strip()) <= level:
+            return match.start()
+    return len(text)
+
+
+def traceability_matrix(text: str) -> Optional[str]:
+    match = MATRIX_HEADING.search(text)
+    if not match:
+        return None
+    return text[match.start():section_end(text, match.start(), heading_level(match.group(0)))]
+
+
+def without_matrix(text: str) -> str:
+    matrix = traceability_matrix(text)
+    return text.replace(matrix, "") if matrix else text
+
+
+def check_traceability(outputs: Dict[str, str]) -> Tuple[List[dict], dict]:
+    issues = []
+    defined_by = {source: defined_ids(without_matrix(text)) for source, text in outputs.items()}
+    defined = set().union(*defined_by.values())
+    matrices = [(source, traceability_matrix(text)) for source, text in outputs.items()]
+    matrices = [(source, matrix) for source, matrix in matrices if matrix]
+    if not matrices:
+        owner = MATRIX_SOURCE if MATRIX_SOURCE in outputs else next(
+            (source for source, ids in defined_by.items() if any(i.startswith(("UC-", "US-")) for i in ids)), None)
+        if owner:
+            issues.append(issue("traceability", "high", owner, "Requirements Traceability Matrix not found"))
+    linked = set()
+    for source, matrix in matrices:
+        ids = referenced_ids(matrix)
+        linked |= ids
+        for missing in sorted(ids - defined):
+            issues.append(issue("traceability", "high", source,
+                                f"{missing} is referenced in the traceability matrix but never defined"))
+    if matrices:
+        for orphan in sorted(i for i in defined - linked if i.startswith(("FR-", "UC-", "US-"))):
+            issues.append(issue("traceability", "medium", matrices[0][0],
+                                f"{orphan} is defined but missing from the traceability matrix"))
+    return issues, {"defined_ids": len(defined), "matrix_ids": len(linked)}
+
+
+def enclosing_level(text: str, position: int) -> int:
+    headings = list(HEADING.finditer(text, 0, position))
+    return heading_level(headings[-1].group(0).strip()) if headings else 0
+
+
+def user_stories(text: str) -> Dict[str, str]:
+    text = without_matrix(text)
+    stories = {}
+    starts = []
+    for match in DEFINITION_PATTERN.finditer(text):
+        story_id = normalize_id(*match.groups())
+        if match.group(1).upper() == "US" and not (starts and starts[-1][1] == story_id):
+            starts.append((match.start(), story_id))
+    for position, (start, story_id) in enumerate(starts):
+        level = heading_level(text[start:].lstrip(" ")) or enclosing_level(text, start)
+        end = section_end(text, start, level) if level else len(text)
+        if position + 1 < len(starts):
+            end = min(end, starts[position + 1][0])
+        stories[story_id] = stories.get(story_id, "") + text[start:end]
+    return stories
+
+
+def check_user_stories(outputs: Dict[str, str]) -> Tuple[List[dict], dict]:
+    issues = []
+    count = 0
+    for source, text in outputs.items():
+        for story_id, body in user_stories(text).items():
+            count += 1
+            words = {word.casefold() for word in GHERKIN_STEP.findall(body)}
+            missing = [step.capitalize() for step, keywords in GHERKIN_STEPS.items()
+                       if not words & set(keywords)]
+            if missing:
+                issues.append(issue("acceptance_criteria", "high", source,
+                                    f"{story_id} acceptance criteria lack Gherkin steps: {', '.join(missing)}"))
+    return issues, {"user_stories": count}
+
+
+def mermaid_errors(block: str) -> List[str]:
+    lines = [line.strip() for line in block.splitlines()
+             if line.strip() and not line.strip().startswith("%%")]
+    if not lines:
+        return ["empty diagram"]
+    header = lines[0].split()[0]
+    if header not in MERMAID_TYPES:
+        return [f"unknown diagram type '{header}'"]
+    errors = []
+    text = MERMAID_STRING.sub('""', "\n".join(lines[1:]))
+    if header in ("flowchart", "graph"):
+        text = ASYMMETRIC_NODE.sub("", text)
+    for opening, closing in ("[]", "()", "{}"):
+        if text.count(opening) != text.count(closing):
+            errors.append(f"unbalanced '{opening}{closing}' ({text.count(opening)} vs {text.count(closing)})")
+    if text.count('"') % 2:
+        errors.append("unterminated string literal")
+    openers = BLOCK_OPENERS.get(header, ())
+    depth = 0
+    for number, line in enumerate(lines[1:], start=2):
+        keyword = line.split()[0].lower()
+        if keyword in openers:
+            depth += 1
+        elif keyword == "end":
+            depth -= 1
+            if depth < 0:
+                errors.append(f"line {number}: 'end' without an open block")
+                depth = 0
+        elif header == "sequenceDiagram" and not SEQUENCE_LINE.search(line):
+            errors.append(f"line {number}: cannot parse '{line[:60]}'")
+        elif header in ("flowchart", "graph") and "--" in line and not FLOW_EDGE.search(line):
+            errors.append(f"line {number}: malformed edge '{line[:60]}'")
+    if depth > 0:
+        errors.append(f"{depth} block(s) not closed with 'end'")
+    return errors
+
+
+def check_diagrams(outputs: Dict[str, str]) -> Tuple[List[dict], dict]:
+    issues = []
+    count = 0
+    for source, text in outputs.items():
+        for index, block in enumerate(MERMAID_BLOCK.findall(text), start=1):
+            count += 1
+            for error in mermaid_errors(block):
+                issues.append(issue("mermaid", "medium", source, f"diagram #{index}: {error}"))
+    if "create_process_diagrams" in outputs and not MERMAID_BLOCK.search(outputs["create_process_diagrams"]):
+        issues.append(issue("mermaid", "critical", "create_process_diagrams", "no Mermaid diagrams found"))
+    return issues, {"diagrams": count}
+
+
+CHECKS = (check_traceability, check_user_stories, check_diagrams)
+
+
+def produced_outputs(outputs: Dict[str, str]) -> Dict[str, str]:
+    return {name: text for name, text in outputs.items() if name not in VALIDATED_TASKS}
+
+
+def validate_outputs(outputs: Dict[str, str]) -> Tuple[List[dict], dict]:
+    issues = []
+    stats = {}
+    for check in CHECKS:
+        found, check_stats = check(outputs)
+        issues.extend(found)
+        stats.update(check_stats)
+    issues.sort(key=lambda item: SEVERITY_ORDER.index(item["severity"]))
+    return issues, stats
+
+
+def format_report(issues: List[dict], stats: dict) -> str:
+    lines = ["# Automated Validation Report",
+             "Mechanical checks already performed locally: ID resolution in the traceability matrix, "
+             "Given/When/Then scenarios in user stories, Mermaid syntax. Do not repeat them; "
+             "include these findings in the final report as-is.",
+             f"Checked: {stats.get('defined_ids', 0)} IDs ({stats.get('matrix_ids', 0)} in the traceability "
+             f"matrix), {stats.get('user_stories', 0)} user stories, {stats.get('diagrams', 0)} diagrams."]
+    if not issues:
+        lines.append("No mechanical issues found.")
+    for item in issues:
+        lines.append(f"- [{item['severity'].upper()}] {item['check']} ({item['source']}): {item['message']}")
+    return "\n".join(lines)
+
+
+def local_validation(name: str, upstream: List[Tuple[str, str]]) -> Optional[str]:
+    if name not in VALIDATED_TASKS:
+        return None
+    with tracer.span("validator", name) as span:
+        issues, stats = validate_outputs(dict(upstream))
+        span["issues"] = len(issues)
+    return format_report(issues, stats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local requirement checks on saved artifacts")
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+    outputs = {}
+    for path in args.paths:
+        with open(path, encoding="utf-8") as f:
+            outputs[path] = f.read()
+    issues, stats = validate_outputs(outputs)
+    print(format_report(issues, stats))
+    return 1 if any(item["severity"] in ("critical", "high") for item in issues) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from chunking import iter_chunks
+from common import write_atomic
+
+INDEX_DIR = ".vector_index"
+EMBEDDING_MODEL = "text-embedding-3-small"
+LOCAL_EMBEDDING_DIM = 512
+EMBED_BATCH_SIZE = 64
+PASSAGE_TOKENS = 300
+PASSAGE_OVERLAP = 50
+INITIAL_CAPACITY = 1024
+MIN_TRAIN_SIZE = 2048
+DEFAULT_NPROBE = 8
+DEFAULT_LIMIT = 2
+SIMILARITY_THRESHOLDS = {"local": 0.05, "openai": 0.3}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def local_embed(texts: List[str], dim: int = LOCAL_EMBEDDING_DIM) -> np.ndarray:
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = re.findall(r"\w+", text.casefold())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % dim
+            vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def openai_embed(texts: List[str], model: str = EMBEDDING_MODEL) -> np.ndarray:
+    from openai import OpenAI
+
+    client = OpenAI(base_url=os.getenv("EMBEDDING_BASE_URL") or None)
+    response = client.embeddings.create(model=model, input=texts)
+    vectors = np.array([item.embedding for item in response.data], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def embedding_provider() -> str:
+    return "openai" if os.getenv("EMBEDDING_PROVIDER", "local") == "openai" else "local"
+
+
+def default_embedder() -> Callable[[List[str]], np.ndarray]:
+    return openai_embed if embedding_provider() == "openai" else local_embed
+
+
+def embedder_name(embed: Callable) -> str:
+    if embed is local_embed:
+        return f"local:{LOCAL_EMBEDDING_DIM}"
+    if embed is openai_embed:
+        return f"openai:{EMBEDDING_MODEL}"
+    return getattr(embed, "__name__", type(embed).__name__)
+
+
+def similarity_threshold() -> float:
+    return float(os.getenv("VECTOR_INDEX_THRESHOLD", SIMILARITY_THRESHOLDS[embedding_provider()]))
+
+
+def embed_batched(embed: Callable[[List[str]], np.ndarray], texts: List[str],
+                  batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    batches = [embed(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+    return np.vstack(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+
+
+def kmeans(vectors: np.ndarray, clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(clusters):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroid = members.mean(axis=0)
+                centroids[cluster] = centroid / max(np.linalg.norm(centroid), 1e-12)
+    return centroids
+
+
+class EmbedderMismatch(ValueError):
+    pass
+
+
+class VectorIndex:
+    def __init__(self, directory: str = INDEX_DIR, embed: Callable = None):
+        self.directory = directory
+        self.embed = embed or default_embedder()
+        self.embedder = embedder_name(self.embed)
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        with self._file_lock():
+            self._load()
+
+    def _load(self) -> None:
+        self.state = self._read_state()
+        self.meta = self._load_meta()
+        self.hashes = {entry["hash"] for entry in self.meta}
+        self.vectors = self._open_vectors() if self.state["capacity"] else None
+        self.centroids = None
+        self.assignment = None
+        if self.state["trained_at"] and os.path.exists(self._path("centroids.npy")):
+            self.centroids = np.load(self._path("centroids.npy"))
+            self.assignment = self._assign(0, self.state["count"])
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _file_lock(self):
+        # Batch workers share the index directory; appends from another process must be seen before writing.
+        with self._lock, open(self._path("lock"), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_state(self) -> dict:
+        state = {"count": 0, "dim": 0, "capacity": 0, "trained_at": 0, "embedder": None}
+        try:
+            with open(self._path("state.json"), encoding="utf-8") as f:
+                state.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        return state
+
+    def _check_embedder(self, dim: int = None) -> None:
+        recorded = self.state.get("embedder")
+        if self.state["count"] and ((recorded and recorded != self.embedder)
+                                    or (dim and self.state["dim"] and dim != self.state["dim"])):
+            raise EmbedderMismatch(
+                f"Index {self.directory} was built with embedder {recorded or 'unknown'} "
+                f"({self.state['dim']} dimensions), the current one is {self.embedder}"
+                f"{f' ({dim} dimensions)' if dim else ''}. Restore EMBEDDING_PROVIDER or run "
+                f"`python vector_index.py rebuild --dir {self.directory}`.")
+
+    def _open_vectors(self, mode: str = "r+") -> np.memmap:
+        return np.memmap(self._path("vectors.f32"), dtype=np.float32, mode=mode,
+                         shape=(self.state["capacity"], self.state["dim"]))
+
+    def _load_meta(self) -> List[dict]:
+        path = self._path("meta.jsonl")
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        entries = {}
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                entries[entry["id"]] = entry
+            except (ValueError, KeyError, TypeError):
+                continue
+        meta = []
+        while len(meta) < self.state["count"] and len(meta) in entries:
+            meta.append(entries[len(meta)])
+        if len(meta) < self.state["count"]:
+            self.state["count"] = len(meta)
+            self.state["trained_at"] = min(self.state["trained_at"], len(meta))
+            self._save_state()
+        meta = meta[:self.state["count"]]
+        if len(lines) != len(meta):
+            write_atomic(path, "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in meta))
+        return meta
+
+    def _save_state(self) -> None:
+        write_atomic(self._path("state.json"), json.dumps(self.state))
+
+    def _ensure_capacity(self, needed: int, dim: int) -> None:
+        self._check_embedder(dim)
+        if not self.state["dim"]:
+            self.state["dim"] = dim
+        if needed <= self.state["capacity"]:
+            return
+        capacity = max(INITIAL_CAPACITY, self.state["capacity"])
+        while capacity < needed:
+            capacity *= 2
+        if self.vectors is not None:
+            self.vectors.flush()
+            del self.vectors
+        with open(self._path("vectors.f32"), "ab") as f:
+            f.truncate(capacity * dim * 4)
+        self.state["capacity"] = capacity
+        self.vectors = self._open_vectors()
+
+    def _assign(self, start: int, end: int) -> np.ndarray:
+        if end <= start:
+            return np.zeros(0, dtype=np.int32)
+        return np.argmax(self.vectors[start:end] @ self.centroids.T, axis=1).astype(np.int32)
+
+    def train(self) -> None:
+        count = self.state["count"]
+        if count < MIN_TRAIN_SIZE:
+            return
+        clusters = int(np.sqrt(count))
+        sample = np.asarray(self.vectors[:count])
+        if count > clusters * 256:
+            sample = sample[np.random.default_rng(0).choice(count, clusters * 256, replace=False)]
+        self.centroids = kmeans(sample, clusters)
+        np.save(self._path("centroids.npy"), self.centroids)
+        self.assignment = self._assign(0, count)
+        self.state["trained_at"] = count
+        self._save_state()
+
+    def add(self, texts: List[str], source: str) -> int:
+        with self._file_lock():
+            if self._read_state() != self.state:
+                self._load()
+            return self._append(texts, source)
+
+    def _append(self, texts: List[str], source: str, vectors: np.ndarray = None) -> int:
+        self._check_embedder()
+        fresh = []
+        batch = set()
+        for text in texts:
+            digest = content_hash(text)
+            if digest not in self.hashes and digest not in batch:
+                batch.add(digest)
+                fresh.append((text, digest))
+        if not fresh:
+            return 0
+        if vectors is None:
+            vectors = embed_batched(self.embed, [text for text, _ in fresh])
+        start = self.state["count"]
+        self._ensure_capacity(start + len(fresh), vectors.shape[1])
+        self.vectors[start:start + len(fresh)] = vectors
+        self.vectors.flush()
+        entries = [{"id": start + offset, "source": source, "hash": digest, "text": text}
+                   for offset, (text, digest) in enumerate(fresh)]
+        with open(self._path("meta.jsonl"), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        self.state["count"] = start + len(fresh)
+        self.state["embedder"] = self.embedder
+        self._save_state()
+        self.meta.extend(entries)
+        self.hashes |= batch
+        if self.centroids is not None:
+            self.assignment = np.concatenate([self.assignment, self._assign(start, self.state["count"])])
+        if self.state["count"] >= max(MIN_TRAIN_SIZE, 2 * self.state["trained_at"]):
+            self.train()
+        return len(fresh)
+
+    def rebuild(self) -> int:
+        with self._file_lock():
+            self._load()
+            entries = list(self.meta)
+            vectors = embed_batched(self.embed, [entry["text"] for entry in entries])
+            self.vectors = None
+            for name in ("vectors.f32", "centroids.npy"):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            open(self._path("meta.jsonl"), "w").close()
+            self.state = {"count": 0, "dim": 0, "capacity": 0, "trained_at": 0, "embedder": self.embedder}
+            self._save_state()
+            self._load()
+            offset = 0
+            for source, group in itertools.groupby(entries, key=lambda entry: entry["source"]):
+                texts = [entry["text"] for entry in group]
+                self._append(texts, source, vectors[offset:offset + len(texts)])
+                offset += len(texts)
+            return self.state["count"]
+
+    def ingest_text(self, text: str, source: str) -> int:
+        return self.add(list(iter_chunks(text, PASSAGE_TOKENS, PASSAGE_OVERLAP)), source)
+
+    def ingest_file(self, path: str) -> int:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return self.ingest_text(f.read(), os.path.abspath(path))
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, nprobe: int = DEFAULT_NPROBE,
+               threshold: float = 0.0, source_filter: Callable[[str], bool] = None) -> List[dict]:
+        with self._lock:
+            count = self.state["count"]
+            if not count:
+                return []
+            self._check_embedder()
+            vector = self.embed([query])[0]
+            self._check_embedder(len(vector))
+            if self.centroids is not None and nprobe < len(self.centroids):
+                probes = np.argsort(-(self.centroids @ vector))[:nprobe]
+                candidates = np.nonzero(np.isin(self.assignment[:count], probes))[0]
+            else:
+                candidates = np.arange(count)
+            if source_filter is not None:
+                candidates = np.array([i for i in candidates if source_filter(self.meta[i]["source"])],
+                                      dtype=np.int64)
+            if not len(candidates):
+                return []
+            scores = np.asarray(self.vectors[candidates]) @ vector
+            order = np.argsort(-scores)[:limit]
+            return [dict(self.meta[int(candidates[i])], score=float(scores[i]))
+                    for i in order if scores[i] >= threshold]
+
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> VectorIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VectorIndex(os.getenv("VECTOR_INDEX_DIR", INDEX_DIR))
+        return _index
+
+
+def search_knowledge_base(query: str) -> str:
+    try:
+        results = get_index().search(query, limit=DEFAULT_LIMIT,
+                                     nprobe=int(os.getenv("VECTOR_INDEX_NPROBE", DEFAULT_NPROBE)),
+                                     threshold=similarity_threshold())
+    except Exception as e:
+        return f"Ошибка при поиске в базе знаний: {str(e)}"
+    if not results:
+        return "Ничего релевантного в базе знаний не найдено."
+    return "\n\n".join(f"[{os.path.basename(r['source'])}, score {r['score']:.2f}]\n{r['text']}" for r in results)
+
+
+def create_index_search_tool():
+    from tool_registry import function_tool
+
+    return function_tool(
+        search_knowledge_base,
+        name="Knowledge Base Search",
+        description="Search previously generated BRDs, reports and reference documents for relevant passages"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent vector index of prior reports and documents")
+    parser.add_argument("--dir", default=os.getenv("VECTOR_INDEX_DIR", INDEX_DIR))
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest")
+    ingest.add_argument("paths", nargs="+")
+    search = commands.add_parser("search")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=5)
+    search.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    commands.add_parser("rebuild", help="re-embed every stored passage with the current embedder")
+    args = parser.parse_args(argv)
+
+    index = VectorIndex(args.dir)
+    if args.command == "rebuild":
+        print(f"Rebuilt {index.rebuild()} passages with {index.embedder}")
+    elif args.command == "ingest":
+        for path in args.paths:
+            print(f"{path}: {index.ingest_file(path)} new passages")
+        print(f"Index size: {index.state['count']} passages")
+    else:
+        for result in index.search(args.query, args.limit, args.nprobe):
+            print(f"{result['score']:.3f} {result['source']}\n  {result['text'][:200]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())